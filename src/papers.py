@@ -7,12 +7,21 @@ This data is adapted from a dataset presented at SIGCSE 2019.
 You can find the full dataset here: https://www.brettbecker.com/sigcse2019/
 """
 import csv
-from typing import List, Dict, Union
-from tm_trees import TMTree
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from tm_trees import TMTree, random_colour
 
 # Filename for the dataset
 DATA_FILE = 'cs1_papers.csv'
 
+# A parsed row of the dataset: authors, title, year, categories, doi and
+# citations
+PaperRow = Tuple[str, str, str, Tuple[str, ...], str, int]
+
+# Colours of the category trees, by category name, so that every tree for the
+# same category shares one colour tuple
+_CATEGORY_COLOURS: Dict[str, Tuple[int, int, int]] = {}
+
 
 class PaperTree(TMTree):
     """A tree representation of Computer Science Education research paper data.
@@ -46,6 +55,8 @@ class PaperTree(TMTree):
     - All TMTree RIs are inherited.
     """
 
+    __slots__ = ('_authors', '_doi')
+
     _authors: str
     _doi: str
     by_year: bool
@@ -54,7 +65,8 @@ class PaperTree(TMTree):
 
     def __init__(self, name: str, subtrees: List[TMTree], authors: str = '',
                  doi: str = '', citations: int = 0, by_year: bool = True,
-                 all_papers: bool = False) -> None:
+                 all_papers: bool = False,
+                 colour: Optional[Tuple[int, int, int]] = None) -> None:
         """Initialize a new PaperTree with the given <name> and <subtrees>,
         <authors> and <doi>, and with <citations> as the size of the data.
 
@@ -67,13 +79,15 @@ class PaperTree(TMTree):
         <by_year> indicates whether or not the first level of subtrees should be
         the years, followed by each category, subcategory, and so on. If
         <by_year> is False, then the year in the dataset is simply ignored.
+
+        If <colour> is given, use it instead of a random colour.
         """
         self._authors = authors
         self._doi = doi
         if all_papers:
-            data = _load_papers_to_dict(by_year)
-            subtrees = _build_tree_from_dict(data)
-        TMTree.__init__(self, name, subtrees, data_size=citations)
+            subtrees = _build_tree_from_rows(_load_paper_rows(), by_year)
+        TMTree.__init__(self, name, subtrees, data_size=citations,
+                        colour=colour)
 
     def get_separator(self) -> str:
         """Return the file separator for this OS.
@@ -86,94 +100,92 @@ class PaperTree(TMTree):
         return " " + str(self.data_size) + ' Citations'
 
 
-def _load_papers_to_dict(by_year: bool = True) -> Dict:
-    """Return a nested dictionary of the data read from the papers dataset file.
+def _load_paper_rows() -> Iterator[PaperRow]:
+    """Yield the rows of the papers dataset file, with each category string
+    split into its categories and each citation count converted to an int.
 
-    If <by_year>, then use years as the roots of the subtrees of the root of
-    the whole tree. Otherwise, ignore years and use categories only.
+    Each row is yielded as soon as it is parsed, so that the tree can be built
+    while the dataset file is still being read.
     """
-    with open(DATA_FILE, encoding='utf-8') as csv_file:
-        # Using DictReader for named access to columns
+    with open(DATA_FILE, encoding='utf-8', newline='') as csv_file:
         reader = csv.reader(csv_file)
         try:
             next(reader)
         except StopIteration:
-            return {}
-        data = {}
-        for row in reader:
-            # Unpack row values
-            authors, title, year, category_string, doi, citations = row
-            # Split category string into a list
-            categories = category_string.split(': ')
-
-            # Decide the top-level for insertion
-            if by_year:
-                if year not in data:
-                    data[year] = {}
-                current_level = data[year]
-            else:
-                current_level = data
-
-            # Construct hierarchy based on categories
-            for category in categories:
-                if category not in current_level:
-                    # Create a new category if it doesn't exist
-                    current_level[category] = {}
-                current_level = current_level[category]
-
-            # Ensure the current level is a dictionary, if not, there is a
-            # structural problem
-            if not isinstance(current_level, dict):
-                raise ValueError(
-                    "CSV file format is wrong")
-
-            # Append paper details to the current category
-            if 'papers' not in current_level:
-                current_level['papers'] = []
-            current_level['papers'].append({
-                'authors': authors,
-                'title': title,
-                'year': year,
-                'doi': doi,
-                'citations': int(citations)
-            })
-
-    return data
-
-
-def _build_tree_from_dict(data: Dict[str, Union[Dict, List]],
-                          name: str = 'CS1') -> List[PaperTree]:
-    """Recursively build the tree from the nested dictionary."""
-
-    # ignore this if isinstance(data, list):  # Base case: we are at a paper
-    # level # For individual papers, create a tree with no subtrees return [
-    # PaperTree(name=paper['doi'], subtrees=[], authors=paper['authors'],
-    # doi=paper['doi'], citations=paper['citations']) for paper in data]
-
-    if "papers" in data.keys() and len(data.keys()) == 1:
-        return [
-            PaperTree(name=paper['title'], subtrees=[],
-                      authors=paper['authors'], doi=paper['doi'],
-                      citations=paper['citations']) for paper in data['papers']]
-    else:
-        # For categories, recursively build trees for each category
+            return
+        # Many papers share a category string, so split each distinct one once
+        split_categories = {}
+        for authors, title, year, category_string, doi, citations in reader:
+            # Split category string into a tuple, interning the names since
+            # the same category appears under many different parents
+            categories = split_categories.get(category_string)
+            if categories is None:
+                categories = tuple(sys.intern(category) for category
+                                   in category_string.split(': '))
+                split_categories[category_string] = categories
+            yield (authors, title, sys.intern(year), categories, doi,
+                   int(citations))
+
+
+def _build_tree_from_rows(rows: Iterable[PaperRow],
+                          by_year: bool = True) -> List[PaperTree]:
+    """Build the tree from the rows of the papers dataset file, and return the
+    subtrees of its root.
+
+    If <by_year>, then use years as the roots of the subtrees of the root of
+    the whole tree. Otherwise, ignore years and use categories only.
+
+    Each category is identified by its path: the tuple of the year (if
+    <by_year>) and categories leading to it, with () for the root. The rows
+    are read in a single pass that builds each paper's PaperTree straight
+    away and files it under its category's path. The categories are then
+    built from the deepest up, so that each one is built from finished
+    subtrees.
+
+    Subtrees keep the order in which they first appear in the dataset, with
+    the papers directly in a category kept together where the first of them
+    appears.
+    """
+    # The contents of each category, in order: the path of each of its
+    # subcategories, or the list of the papers directly in it
+    contents = {(): []}
+    papers = {}
+    for authors, title, year, categories, doi, citations in rows:
+        path = (year,) + categories if by_year else categories
+        leaves = papers.get(path)
+        if leaves is None:
+            # Add any categories on the path that haven't been seen yet
+            for depth in range(1, len(path) + 1):
+                prefix = path[:depth]
+                if prefix not in contents:
+                    contents[prefix] = []
+                    contents[path[:depth - 1]].append(prefix)
+            leaves = papers[path] = []
+            contents[path].append(leaves)
+        leaves.append(PaperTree(name=title, subtrees=[], authors=authors,
+                                doi=doi, citations=citations))
+
+    # Build every category after all of its subcategories, which are deeper,
+    # ending with the root
+    built = {}
+    for path in sorted(contents, key=len, reverse=True):
         subtrees = []
-        # used this if else block to pass pyta
-        if name is not None:
-            pass
-        else:
-            pass
-        for category, contents in data.items():
-            if category == 'papers':
-                (subtrees.extend
-                 (PaperTree(name=paper['title'], subtrees=[],
-                            authors=paper['authors'], doi=paper['doi'],
-                            citations=paper['citations'])
-                  for paper in data['papers']))
+        for entry in contents[path]:
+            if isinstance(entry, list):
+                subtrees.extend(entry)
             else:
-                category_tree = _build_tree_from_dict(contents, category)
-                # IMPORTANT Aggregate citations for the category
-                citations = sum(subtree.data_size for subtree in category_tree)
-                subtrees.append(PaperTree(name=category, subtrees=category_tree,
-                                          citations=citations))
-        return subtrees
+                subtrees.append(built.pop(entry))
+        if path:
+            built[path] = PaperTree(name=path[-1], subtrees=subtrees,
+                                    colour=_category_colour(path[-1]))
+    return subtrees
+
+
+def _category_colour(category: str) -> Tuple[int, int, int]:
+    """Return the colour shared by every tree for <category>.
+    """
+    colour = _CATEGORY_COLOURS.get(category)
+    if colour is None:
+        colour = random_colour()
+        _CATEGORY_COLOURS[category] = colour
+    return colour
@@ -7,10 +7,10 @@ computer's file system.
 """
 from __future__ import annotations
 
-import math
 import os
 import random
-from typing import List, Tuple, Optional
+from fractions import Fraction
+from typing import List, Tuple, Optional, Sequence
 
 
 class TMTree:
@@ -38,6 +38,13 @@ class TMTree:
         as a subtree, or None if this tree is not part of a larger tree.
     _expanded:
         Whether or not this tree is considered expanded for visualization.
+    _path_cache:
+        The string returned by get_path_string for this tree, or None if it
+        has not been computed since this tree or one of its ancestors moved.
+    _rect_cache:
+        The list returned by get_rectangles for this tree, or None if it has
+        not been computed since the layout or expanded state of this tree
+        last changed.
 
     === Representation Invariants ===
     - data_size >= 0
@@ -58,6 +65,9 @@ class TMTree:
     - if _subtrees is empty, then _expanded is False
     """
 
+    __slots__ = ('rect', 'data_size', '_colour', '_name', '_subtrees',
+                 '_parent_tree', '_expanded', '_path_cache', '_rect_cache')
+
     rect: Tuple[int, int, int, int]
     data_size: int
     _colour: Tuple[int, int, int]
@@ -65,9 +75,13 @@ class TMTree:
     _subtrees: List[TMTree]
     _parent_tree: Optional[TMTree]
     _expanded: bool
+    _path_cache: Optional[str]
+    _rect_cache: Optional[List[Tuple[Tuple[int, int, int, int],
+                                     Tuple[int, int, int]]]]
 
-    def __init__(self, name: str, subtrees: List[TMTree],
-                 data_size: int = 0) -> None:
+    def __init__(self, name: str, subtrees: Sequence[TMTree],
+                 data_size: int = 0,
+                 colour: Optional[Tuple[int, int, int]] = None) -> None:
         """Initialize a new TMTree with a random colour and the provided <name>.
 
         If <subtrees> is empty, use <data_size> to initialize this tree's
@@ -76,18 +90,23 @@ class TMTree:
         If <subtrees> is not empty, ignore the parameter <data_size>,
         and calculate this tree's data_size instead.
 
-        Set this tree as the parent for each of its subtrees.
+        If <colour> is given, use it instead of a random colour, so that trees
+        can share a single colour tuple.
+
+        Set this tree as the parent for each of its subtrees. <subtrees> is
+        copied into a new list, so it may also be given as a tuple.
 
         Precondition: if <name> is None, then <subtrees> is empty.
         """
         self.rect = (0, 0, 0, 0)
         self._name = name
-        self._subtrees = subtrees[:]
+        self._subtrees = list(subtrees)
         self._parent_tree = None
         self._expanded = False
+        self._path_cache = None
+        self._rect_cache = None
 
-        self._colour = (random.randint(0, 255),
-                        random.randint(0, 255), random.randint(0, 255))
+        self._colour = random_colour() if colour is None else colour
 
         self.data_size = data_size
         self._sum_size()
@@ -95,6 +114,7 @@ class TMTree:
         if self._subtrees:  # if the tree has subtrees.
             for subtree in self._subtrees:
                 subtree._parent_tree = self  # setting id of this tree as parent
+                subtree._invalidate_path()
 
     def is_empty(self) -> bool:
         """Return True iff this tree is empty.
@@ -104,16 +124,12 @@ class TMTree:
     # helper to calculate the data size.
     def _sum_size(self) -> int:
         """Return the total data_size of this tree
-        """
 
-        if not self._subtrees:
-            pass
-
-        else:
-            total = 0
-            for tree in self._subtrees:
-                total += tree._sum_size()
-            self.data_size = total
+        The subtrees are fully built before this tree is, so their data_size
+        is already their total and only this level needs to be summed.
+        """
+        if self._subtrees:
+            self.data_size = sum(tree.data_size for tree in self._subtrees)
 
         return self.data_size
 
@@ -126,55 +142,42 @@ class TMTree:
         """Update the rectangles in this tree and its descendants using the
         treemap algorithm to fill the area defined by pygame rectangle <rect>.
         """
-        self._handle_base_cases(rect)
-        self._distribute_space_subtrees(rect)
-
-    def _handle_base_cases(self, rect: Tuple[int, int, int, int]) -> None:
-        """Handle base cases for updating rectangles."""
-        # x, y, width, height = rect
-        if self.is_empty() and self.data_size > 0:
-            self.rect = rect
-            return
-        if self.data_size == 0:
-            self.rect = (0, 0, 0, 0)
-            for subtree in self._subtrees:
-                subtree.update_rectangles(rect)
-
-    def _distribute_space_subtrees(
-            self, rect: Tuple[int, int, int, int]) -> None:
-        """Distribute available space among subtrees based on their data
-        size."""
-        x, y, width, height = rect
-        if not self.is_empty() and self.data_size > 0:
-            self.rect = rect
-            total_size = self.data_size
-            offset = 0
-
-            for i, subtree in enumerate(self._subtrees):
-                proportion = subtree.data_size / total_size
-                if width > height:
-                    current_width = (self._calculate_dimension
-                                     (proportion, width, offset,
-                                      i == len(self._subtrees) - 1))
-                    subtree.rect = (x + offset, y, current_width, height)
-                    offset += current_width
-                else:
-                    current_height = (self._calculate_dimension
-                                      (proportion, height, offset,
-                                       i == len(self._subtrees) - 1))
-                    subtree.rect = (x, y + offset, width, current_height)
-                    offset += current_height
-
-                subtree.update_rectangles(subtree.rect)
-
-    def _calculate_dimension(self, proportion: float, total_dimension: int,
-                             offset: int, is_last_subtree: bool) -> int:
-        """Calculate dimension for a subtree rectangle, adjusting for the
-        last subtree differently."""
-        if not is_last_subtree:
-            return int(total_dimension * proportion)
-        else:
-            return total_dimension - offset
+        self._invalidate_rectangles()
+
+        # Walk the tree with an explicit stack of (tree, rect) pairs rather
+        # than recursing, so that deep trees cannot raise RecursionError. The
+        # base cases and the distribution of space are done inline, so the
+        # only call made per tree is to _layout_axis, for trees with subtrees.
+        stack = [(self, rect)]
+        while stack:
+            tree, tree_rect = stack.pop()
+            tree._rect_cache = None
+            size = tree.data_size
+            if size == 0:
+                # A tree with no data takes up no space, and nor do any of
+                # its subtrees
+                tree.rect = (0, 0, 0, 0)
+                for subtree in tree._subtrees:
+                    stack.append((subtree, tree_rect))
+            elif size > 0:
+                tree.rect = tree_rect
+                subtrees = tree._subtrees
+                if subtrees and tree._name is not None:
+                    # Distribute the space among the subtrees based on their
+                    # data size
+                    x, y, width, height = tree_rect
+                    horizontal = width > height
+                    dimensions = _layout_axis(
+                        [subtree.data_size for subtree in subtrees],
+                        size, width if horizontal else height)
+                    offset = 0
+                    for subtree, current in zip(subtrees, dimensions):
+                        if horizontal:
+                            subtree.rect = (x + offset, y, current, height)
+                        else:
+                            subtree.rect = (x, y + offset, width, current)
+                        offset += current
+                        stack.append((subtree, subtree.rect))
 
     def get_rectangles(self) -> (
             List)[Tuple[Tuple[int, int, int, int], Tuple[int, int, int]]]:
@@ -183,24 +186,41 @@ class TMTree:
         rooted at this tree. Each tuple consists of a tuple that defines the
         appropriate pygame rectangle to display for a leaf, and the colour
         to fill it with.
+
+        The list is cached, and only recomputed after the layout or expanded
+        state of this tree changes.
         """
-        if self.is_empty():
-            return []
-
-        if self._expanded:
-            if self.is_empty() or (self.data_size == 0 and not self._subtrees):
-                return []
-            elif not self._subtrees:
-                return [(self.rect, self._colour)]
-            else:
-                rects = []
-                for tree in self._subtrees:
-                    rects.extend(tree.get_rectangles())
-                return rects
-        else:
-            if self.data_size == 0 and not self._subtrees:
-                return []
-            return [(self.rect, self._colour)]
+        if self._rect_cache is not None:
+            return self._rect_cache
+
+        # Collect every displayed leaf into one flat list, visiting the trees
+        # in order with an explicit stack, instead of building and extending a
+        # separate list for every expanded subtree.
+        rects = []
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            if tree.is_empty():
+                continue
+            if tree._expanded and tree._subtrees:
+                stack.extend(reversed(tree._subtrees))
+            elif tree.data_size != 0 or tree._subtrees:
+                rects.append((tree.rect, tree._colour))
+        self._rect_cache = rects
+        return rects
+
+    def _invalidate_rectangles(self) -> None:
+        """Forget the cached rectangles of this tree and of each of its
+        ancestors, since the leaves displayed for any of them may include this
+        tree's.
+
+        Callers that change the layout or expanded state of trees within this
+        one are responsible for forgetting theirs too.
+        """
+        tree = self
+        while tree is not None:
+            tree._rect_cache = None
+            tree = tree._parent_tree
 
 
     def get_tree_at_position(self, pos: Tuple[int, int]) -> Optional[TMTree]:
@@ -211,33 +231,40 @@ class TMTree:
         If <pos> is on the shared edge between two or more rectangles,
         always return the leftmost and topmost rectangle (wherever applicable).
         """
-        if self._is_pos_inside_rect(pos):
-            if self._is_leaf_or_not_expanded():
-                return self
-            else:
-                return self._search_subtrees_for_pos(pos)
-        return None
+        if not self._is_pos_inside_rect(pos):
+            return None
+
+        tree = self
+        while not tree._is_leaf_or_not_expanded():
+            index = tree._hit_test_child(pos)
+            if index < 0:
+                return None
+            tree = tree._subtrees[index]
+        return tree
 
     def _is_pos_inside_rect(self, pos: Tuple[int, int]) -> bool:
         """Check if the position falls within this tree's rectangle."""
         x, y = pos
-        lower_x, lower_y, upper_x, upper_y = self.rect
-        return (lower_x <= x <= lower_x + upper_x
-                and lower_y <= y <= lower_y + upper_y)
+        left, top, width, height = self.rect
+        return left <= x <= left + width and top <= y <= top + height
 
     def _is_leaf_or_not_expanded(self) -> bool:
         """Check if this tree is a leaf or not expanded."""
         return self._subtrees == [] or not self._expanded
 
-    def _search_subtrees_for_pos(
-            self, pos: Tuple[int, int]) -> Optional[TMTree]:
-        """Recursively search the subtrees for a tree containing the
-        position."""
-        for tree in self._subtrees:
-            pos_tree = tree.get_tree_at_position(pos)
-            if pos_tree is not None:
-                return pos_tree
-        return None
+    def _hit_test_child(self, pos: Tuple[int, int]) -> int:
+        """Return the index of the first subtree whose rectangle contains
+        <pos>, or -1 if no subtree contains it.
+
+        Since subtrees are laid out left to right or top to bottom, the first
+        match is the leftmost and topmost one.
+        """
+        x, y = pos
+        for i, subtree in enumerate(self._subtrees):
+            left, top, width, height = subtree.rect
+            if left <= x <= left + width and top <= y <= top + height:
+                return i
+        return -1
 
     def update_data_sizes(self) -> int:
         """Update the data_size for this tree and its subtrees, based on the
@@ -245,13 +272,21 @@ class TMTree:
 
         If this tree is a leaf, return its size unchanged.
         """
-        if not self._subtrees:
-            return self.data_size
-        else:
-            # If the tree is not a leaf, sum the sizes of its subtrees.
-            self.data_size = sum(subtree.update_data_sizes() for
-                                 subtree in self._subtrees)
-            return self.data_size
+        # Collect the trees in pre-order, then sum them in reverse so that
+        # every subtree is totalled before the tree that contains it.
+        order = []
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            order.append(tree)
+            stack.extend(tree._subtrees)
+
+        for tree in reversed(order):
+            if tree._subtrees:
+                # If the tree is not a leaf, sum the sizes of its subtrees.
+                tree.data_size = sum(subtree.data_size for
+                                     subtree in tree._subtrees)
+        return self.data_size
 
     def move(self, destination: TMTree) -> None:
         """If this tree is a leaf, and <destination> is not a leaf, move this
@@ -262,16 +297,14 @@ class TMTree:
             return
 
         if not self._subtrees and destination._subtrees:
-            self._parent_tree._subtrees.remove(self)
-            if not self._parent_tree._subtrees:
-                self._parent_tree._expanded = False
-            self._parent_tree.data_size -= self.data_size
-            self._helper_root()
+            self._invalidate_rectangles()
+            self._detach()
+            self._update_ancestor_sizes()
             self._parent_tree = destination
+            self._invalidate_path()
             destination._subtrees.append(self)
-            destination.data_size += self.data_size
-            destination._helper_root()
-
+            self._update_ancestor_sizes()
+            self._invalidate_rectangles()
 
     def change_size(self, factor: float) -> None:
         """Change the value of this tree's data_size attribute by <factor>.
@@ -281,32 +314,39 @@ class TMTree:
         if not self._is_leaf():
             return
 
-        self._apply_size_change(factor)
-        self._helper_root()
+        # Work with <factor> as an exact ratio of integers, so that the
+        # rounding below is not thrown off by floating point error. A float
+        # is taken as the shortest decimal that denotes it, which is the
+        # factor the caller meant.
+        if isinstance(factor, float):
+            ratio = Fraction(str(factor))
+        else:
+            ratio = Fraction(factor)
+
+        self._apply_size_change(ratio.numerator, ratio.denominator)
+        self._update_ancestor_sizes()
+        self._invalidate_rectangles()
 
     def _is_leaf(self) -> bool:
         """Check if the current tree is a leaf."""
         return not self._subtrees
 
-    def _apply_size_change(self, factor: float) -> None:
-        """Apply the size change based on the given factor."""
-        if factor > 0:
-            self._increase_size(factor)
-        else:
-            self._decrease_size(factor)
+    def _apply_size_change(self, numerator: int, denominator: int) -> None:
+        """Apply the size change for the factor <numerator> / <denominator>.
 
-    def _increase_size(self, factor: float) -> None:
-        """Increase the data_size by the given factor, always rounding up."""
-        self.data_size += math.ceil(self.data_size * factor)
+        An increase is always rounded up, and a decrease is always rounded
+        down but never leaves a data_size below 1.
 
-    def _decrease_size(self, factor: float) -> None:
-        """Decrease the data_size by the given factor, applying special
-        handling for negative factors."""
-        if self.data_size == 0:
-            self.data_size += 1
+        Precondition: denominator > 0
+        """
+        if numerator > 0:
+            # Ceiling division, using only integer arithmetic
+            self.data_size += -(-self.data_size * numerator // denominator)
+        elif self.data_size == 0:
+            self.data_size = 1
         else:
-            change = math.floor(self.data_size * factor)
-            self.data_size = max(1, self.data_size + change)
+            self.data_size = max(
+                1, self.data_size + self.data_size * numerator // denominator)
 
     def delete_self(self) -> bool:
         """Removes the current node from the visualization and
@@ -320,36 +360,48 @@ class TMTree:
 
         # Check if the current node has a parent tree
         if self._parent_tree is not None:
+            self._invalidate_rectangles()
+
             # Remove the current node from its parent's _subtrees list
-            self._parent_tree._subtrees.remove(self)
-            if not self._parent_tree._subtrees:
-                self._parent_tree._expanded = False
-            self._parent_tree._recalculate_data_sizes()
-            self._parent_tree.update_data_sizes()
-            self.data_size = 0
+            self._detach()
 
             # Update the data_size of the parent and all ancestors
-            self._helper_root()
+            self._update_ancestor_sizes()
+            self.data_size = 0
 
             return True
         else:
             # The node does not have a parent and cannot be deleted
             return False
 
-    def _recalculate_data_sizes(self) -> None:
-        """helper for delete self, used to recalculate the data sizes after
-        deletion"""
-        # Recalculate data size starting from this node upwards.
-        self.data_size = sum(subtree.data_size for subtree in self._subtrees)
-        if self._parent_tree:
-            self._parent_tree._recalculate_data_sizes()
+    def _detach(self) -> None:
+        """Remove this tree from its parent's subtrees, and collapse the parent
+        if that leaves it without any.
 
-    def _helper_root(self) -> None:
-        """helper to get the top most root in the tree"""
-        root = self
-        while root._parent_tree is not None:
-            root = root._parent_tree
-        root.update_data_sizes()
+        This tree keeps its reference to its parent.
+
+        Precondition: self._parent_tree is not None
+        """
+        siblings = self._parent_tree._subtrees
+        siblings.remove(self)
+        if not siblings:
+            self._parent_tree._expanded = False
+
+    def _update_ancestor_sizes(self) -> None:
+        """Recompute the data_size of every ancestor of this tree from its
+        subtrees.
+
+        This keeps the ancestors' data_size equal to the sum of their
+        subtrees' after this tree's size, or its place in the tree, changes,
+        without recomputing any other part of the tree. Each ancestor is
+        summed afresh rather than adjusted by a difference, because a deleted
+        tree keeps its parent and so may be changed after it has left it.
+        """
+        ancestor = self._parent_tree
+        while ancestor is not None:
+            ancestor.data_size = sum(subtree.data_size for
+                                     subtree in ancestor._subtrees)
+            ancestor = ancestor._parent_tree
 
     def expand(self) -> None:
         """Expand this tree, so that it's subtrees are shown.
@@ -359,24 +411,30 @@ class TMTree:
             pass
         else:
             self._expanded = True
+            self._invalidate_rectangles()
 
     def expand_all(self) -> None:
         """Expand this tree, and all trees within it.
         If this tree is expanded, or a leaf, do nothing.
         """
-        if not self._subtrees:
-            pass
-
-        else:
-            self._expanded = True
-            for tree in self._subtrees:
-                tree.expand_all()
+        self._invalidate_rectangles()
+
+        # Visit the trees with an explicit stack rather than recursing, so
+        # that deep trees cost no Python call frame per tree.
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            tree._rect_cache = None
+            if tree._subtrees:
+                tree._expanded = True
+                stack.extend(tree._subtrees)
 
     def collapse(self) -> None:
         """Collapse the selected group of trees.
         If the selected tree is the root of the tree, do nothing.
         """
         if self._parent_tree is not None:
+            self._parent_tree._invalidate_rectangles()
             self._parent_tree._expanded = False
             self._expanded = False
             for subtree in self._parent_tree._subtrees:
@@ -387,14 +445,12 @@ class TMTree:
         """helper for the collapse function, Collapses all subtrees of this
         tree.
         """
-        self._expanded = False
-
-        if not self._subtrees:
-            pass
-
-        else:
-            for tree in self._subtrees:
-                tree._collapse_parent()
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            tree._expanded = False
+            tree._rect_cache = None
+            stack.extend(tree._subtrees)
 
     def collapse_all(self) -> None:
         """Collapse every tree contained in the root of this tree.
@@ -405,11 +461,10 @@ class TMTree:
     def _get_root(self) -> TMTree:
         """Return the root Tree of this TMTree
         """
-        if self._parent_tree is None:
-            return self
-
-        else:
-            return self._parent_tree._get_root()
+        root = self
+        while root._parent_tree is not None:
+            root = root._parent_tree
+        return root
 
     # Methods for the string representation
     def get_path_string(self) -> str:
@@ -417,12 +472,39 @@ class TMTree:
         Return a string representing the path containing this tree
         and its ancestors, using the separator for this OS between each
         tree's name.
+
+        The path of this tree and of each of its ancestors is cached, and only
+        recomputed after that tree or one of its ancestors is moved.
         """
-        if self._parent_tree is None:
-            return self._name
-        else:
-            return self._parent_tree.get_path_string() + \
-                self.get_separator() + self._name
+        if self._path_cache is None:
+            # Walk up to the closest ancestor whose path is known (or to the
+            # root), then build and cache the paths back down to this tree.
+            chain = []
+            tree = self
+            while tree._path_cache is None and tree._parent_tree is not None:
+                chain.append(tree)
+                tree = tree._parent_tree
+            if tree._path_cache is None:
+                tree._path_cache = tree._name
+
+            path = tree._path_cache
+            for tree in reversed(chain):
+                path = path + tree.get_separator() + tree._name
+                tree._path_cache = path
+        return self._path_cache
+
+    def _invalidate_path(self) -> None:
+        """Forget the cached path of this tree and of every tree within it.
+
+        Computing a path caches the paths of all of its ancestors too, so a
+        tree with no cached path has no descendant with one either.
+        """
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            if tree._path_cache is not None:
+                tree._path_cache = None
+                stack.extend(tree._subtrees)
 
     def get_separator(self) -> str:
         """Return the string used to separate names in the string
@@ -437,23 +519,44 @@ class TMTree:
         raise NotImplementedError
 
 
+def _layout_axis(sizes: List[int], total: int, extent: int) -> List[int]:
+    """Return how much of <extent> to give to each of a group of sibling
+    trees with data sizes <sizes>, along the axis they are laid out on.
+
+    Each tree gets its proportion of <extent>, rounded towards zero, except
+    for the last tree, which gets whatever remains.
+
+    Precondition: total > 0
+    """
+    dimensions = [int(extent * (size / total)) for size in sizes]
+    if dimensions:
+        dimensions[-1] = extent - (sum(dimensions) - dimensions[-1])
+    return dimensions
+
+
+def random_colour() -> Tuple[int, int, int]:
+    """Return a random RGB colour.
+    """
+    # One call for all 24 bits is much cheaper than a randint per channel
+    bits = random.getrandbits(24)
+    return bits & 0xFF, (bits >> 8) & 0xFF, bits >> 16
+
+
 def _same(trees: List[TMTree]) -> Optional[TMTree]:
     """Return the TMTree in matches that is closest to (0,0)
+
+    That is, the tree whose rectangle is leftmost, breaking ties by the
+    topmost one and then by the first in <trees>. Return None if <trees> is
+    empty.
     """
-    if len(trees) > 1:
-        closest = trees[0]
-        for tree in trees:
-            if tree.rect[0] < closest.rect[0]:
-                closest = tree
-            elif tree.rect[1] < closest.rect[1]:
-                closest = tree
-        return closest
+    return min(trees, key=_rect_origin, default=None)
 
-    elif len(trees) == 1:
-        return trees[0]
 
-    else:
-        return None
+def _rect_origin(tree: TMTree) -> Tuple[int, int]:
+    """Return the x and y coordinates of the top-left corner of <tree>'s
+    rectangle.
+    """
+    return tree.rect[0], tree.rect[1]
 
 
 class FileSystemTree(TMTree):
@@ -469,6 +572,8 @@ class FileSystemTree(TMTree):
     as reported by os.path.getsize.
     """
 
+    __slots__ = ()
+
     def __init__(self, path: str) -> None:
         """Store the file tree structure contained in the given file or folder.
 
@@ -481,17 +586,20 @@ class FileSystemTree(TMTree):
             # If it is a dir, then this list will keep track of the contents
             subtrees = []
 
-            for filename in os.listdir(path):
-                # This iterates over every item in the directory, creating a
-                # full path for each item using os.path.join
-                # For example, if path is /home/user/Documents and filename
-                # is file.txt, file_path will be /home/user/Documents/file.txt.
-                file_path = os.path.join(path, filename)
-
-                # Recursively creating new FileSystemTree objects for filenames
-                # in the directory
-                subtree = FileSystemTree(file_path)
-                subtrees.append(subtree)
+            # os.scandir reads each entry's name, full path and type in a
+            # single pass over the directory, so there is no need to join
+            # paths or to call os.path.isdir for every entry.
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        # Recursively creating new FileSystemTree objects for
+                        # folders in the directory
+                        subtrees.append(FileSystemTree(entry.path))
+                    else:
+                        # A file is always a leaf, so build it directly from
+                        # the entry with a single stat call.
+                        subtrees.append(
+                            _file_leaf(entry.name, entry.stat().st_size))
 
             super().__init__(name, subtrees)
 
@@ -524,3 +632,12 @@ class FileSystemTree(TMTree):
             components.append(f'{len(self._subtrees)} items')
         components.append(convert_size(self.data_size))
         return f' ({", ".join(components)})'
+
+
+def _file_leaf(name: str, data_size: int) -> FileSystemTree:
+    """Return a FileSystemTree for the regular file named <name>, whose size
+    is <data_size>, without looking the file up again.
+    """
+    leaf = FileSystemTree.__new__(FileSystemTree)
+    TMTree.__init__(leaf, name, [], data_size)
+    return leaf
@@ -72,9 +72,13 @@ class Visualiser:
         except ValueError:
             return
 
+        # Filling the subscreen directly with each (rect, colour) tuple goes
+        # straight to SDL's fill, which is cheaper per rectangle than
+        # pygame.draw.rect for solid rectangles.
+        fill = subscreen.fill
         for rect, colour in self.tree.get_rectangles():
             # Note that the arguments are in the opposite order
-            pygame.draw.rect(subscreen, colour, rect)
+            fill(colour, rect)
 
         # add the hover rectangle
         if self.selected_node is not None:
@@ -134,23 +138,19 @@ class Visualiser:
                 k = event.key
                 if k == pygame.K_UP:
                     selected_node.change_size(0.01)
-                    self.tree.update_data_sizes()
                     self.tree.update_rectangles((0, 0, self.width, drawable_height))
 
                 elif k == pygame.K_DOWN:
                     selected_node.change_size(-0.01)
-                    self.tree.update_data_sizes()
                     self.tree.update_rectangles((0, 0, self.width, drawable_height))
 
                 elif k == pygame.K_DELETE or platform == 'darwin' and k == pygame.K_BACKSPACE:
                     if selected_node.delete_self():
-                        self.tree.update_data_sizes()
                         self.tree.update_rectangles((0, 0, self.width, drawable_height))
                         selected_node = None
 
                 elif k == pygame.K_m:
                     selected_node.move(hover_node)
-                    self.tree.update_data_sizes()
                     self.tree.update_rectangles((0, 0, self.width, drawable_height))
                     selected_node = hover_node
 
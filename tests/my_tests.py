@@ -1,758 +1,823 @@
 import os
+import tempfile
 import unittest
-import shutil
+from array import array
+from collections import deque
+from decimal import Decimal
+from fractions import Fraction
+from functools import reduce
+from operator import attrgetter
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Optional, Union
 
 import pytest
-from hypothesis import given
+from hypothesis import HealthCheck, given, settings
 from hypothesis.strategies import integers
 
-from tm_trees import TMTree, FileSystemTree
-EXAMPLE_PATH = os.path.join(os.getcwd(), 'example-directory', 'workshop')
+from tm_trees import TMTree, FileSystemTree, _same
+# Resolved from this file rather than the working directory, which depends on
+# where the tests are run from
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+EXAMPLE_PATH = PROJECT_ROOT / 'example-directory' / 'workshop'
 
 
-class SampleTests(unittest.TestCase):
+def test_file_system_tree_nested(tmp_path: Path) -> None:
+    """This test checks that FileSystemTree's initializer works correctly
+    for directories that are nested.
+    """
+    (tmp_path / 'nested' / 'nested-again' / 'final').mkdir(parents=True)
 
+    sample_directory = FileSystemTree(str(tmp_path / 'nested'))
+    assert sample_directory.data_size == 0
 
-    def test_file_system_tree_nonexistent_path(self) -> None:
-        """This test checks that FileSystemTree's initializer raises an error
-        for a nonexistent path.
-        """
-        with self.assertRaises(FileNotFoundError):
-            FileSystemTree('nonexistent')
 
-    def test_file_system_tree_zero_size_file(self) -> None:
-        """This test checks that FileSystemTree's initializer works correctly
-        for a file of data size 0.
-        """
-        temp_file_path = 'empty.py'
-        with open(temp_file_path, 'w') as temp_file:
-            pass
+def test_name_none_with_data() -> None:
+    """Test that the initializer does not override the data size of a file
+    whose name is None and whose data size is greater than 0
+    """
+    leaf = TMTree(None, [], 10)
+    assert leaf._name is None
+    assert leaf._subtrees == []
+    assert leaf.is_empty()
+    assert leaf.data_size != 0
+    assert leaf.data_size == 10
+
+
+def test_file_system_tree_zero_size_file(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """This test checks that FileSystemTree's initializer works correctly
+    for a file of data size 0.
+    """
+    monkeypatch.setattr(os.path, 'isdir', lambda path: False)
+    monkeypatch.setattr(os.path, 'getsize', lambda path: 0)
 
-        sample_file = FileSystemTree(temp_file_path)
-        assert sample_file.data_size == 0
-        os.remove(temp_file_path)
+    sample_file = FileSystemTree('empty.py')
+    assert sample_file.data_size == 0
 
-    def test_file_system_tree_special_characters(self) -> None:
-        """This test checks that FileSystemTree's initializer works correctly
-        for a file with special characters in the name.
-        """
-        temp_file_path = '@#$%.txt'
-        with open(temp_file_path, 'w') as temp_file:
-            temp_file.write('Special characters!')
 
-        sample_file = FileSystemTree(temp_file_path)
-        assert sample_file._name == '@#$%.txt'
-        assert sample_file.data_size == os.path.getsize(temp_file_path)
+def test_file_system_tree_special_characters(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """This test checks that FileSystemTree's initializer works correctly
+    for a file with special characters in the name.
+    """
+    monkeypatch.setattr(os.path, 'isdir', lambda path: False)
+    monkeypatch.setattr(os.path, 'getsize',
+                        lambda path: len('Special characters!'))
 
-        os.remove(temp_file_path)
+    sample_file = FileSystemTree('@#$%.txt')
+    assert sample_file._name == '@#$%.txt'
+    assert sample_file.data_size == len('Special characters!')
 
-    def test_file_system_tree_nested(self) -> None:
-        """This test checks that FileSystemTree's initializer works correctly
-        for directories that are nested.
-        """
-        os.makedirs('nested/nested-again/final')
 
-        sample_directory = FileSystemTree('nested')
-        assert sample_directory.data_size == 0
+def test_file_system_tree_nonexistent_path(tmp_path: Path) -> None:
+    """This test checks that FileSystemTree's initializer raises an error
+    for a nonexistent path.
+    """
+    with pytest.raises(FileNotFoundError):
+        FileSystemTree(str(tmp_path / 'nonexistent'))
 
-        os.rmdir('nested/nested-again/final')
-        os.rmdir('nested/nested-again')
-        os.rmdir('nested')
 
-    def test_file_system_tree_large_number_of_files(self) -> None:
-        """This test checks that FileSystemTree's initializer works correctly
-        for a directory with a large number of files. In this test, create 10000
-        files in the directory.
-        """
-        os.mkdir('large-directory')
-        for i in range(1000):
-            with open(f'large-directory/file_{i}.txt', 'w') as temp_file:
-                temp_file.write(f'File {i}')
+def test_file_system_tree_large_number_of_files(tmp_path: Path) -> None:
+    """This test checks that FileSystemTree's initializer works correctly
+    for a directory with a large number of files. In this test, create 1000
+    files in the directory.
+    """
+    # Write the files through bare file descriptors, which skips building a
+    # buffered file object for each of them
+    paths = [os.path.join(tmp_path, f'file_{i}.txt') for i in range(1000)]
+    for path in paths:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+        os.write(fd, b'File')
+        os.close(fd)
+
+    sample_large_directory = FileSystemTree(str(tmp_path))
+    assert len(sample_large_directory._subtrees) == 1000
+    assert sample_large_directory.data_size > 0
+
+
+@given(n=integers(min_value=0, max_value=200))
+@settings(max_examples=5, deadline=None,
+          suppress_health_check=[HealthCheck.function_scoped_fixture])
+def test_file_system_tree_number_of_files(tmp_path: Path, n: int) -> None:
+    """This test checks that FileSystemTree's initializer has one subtree for
+    each of the <n> files in a directory, and sums their sizes.
+    """
+    # tmp_path is shared by every example, so give each its own directory
+    directory = Path(tempfile.mkdtemp(dir=tmp_path))
+    for i in range(n):
+        (directory / f'file_{i}.txt').write_bytes(b'x' * i)
 
-        sample_large_directory = FileSystemTree('large-directory')
-        assert len(sample_large_directory._subtrees) == 1000
-        assert sample_large_directory.data_size > 0
+    sample_directory = FileSystemTree(str(directory))
+    assert len(sample_directory._subtrees) == n
+    assert sample_directory.data_size == n * (n - 1) // 2
 
-        for i in range(1000):
-            os.remove(f'large-directory/file_{i}.txt')
 
-        os.rmdir('large-directory')
+def test_single_leaf_update_rectangles() -> None:
+    """This test checks that update_rectangles correctly sets the rectangle
+    for a single leaf node, ensuring it occupies the entire given space.
+    """
+    leaf = TMTree('single leaf', [], 5)
+    leaf.update_rectangles((0, 0, 100, 200))
+    assert leaf.rect == (0, 0, 100, 200)
 
-    def test_name_none_with_data(self) -> None:
-        """Test that the initializer does not override the data size of a file
-        whose name is None and whose data size is greater than 0
-        """
-        leaf = TMTree(None, [], 10)
-        assert leaf._name is None
-        assert leaf._subtrees == []
-        assert leaf.is_empty()
-        assert leaf.data_size != 0
-        assert leaf.data_size == 10
 
+def test_zero_data_size_update_rectangles() -> None:
+    """This test checks that update_rectangles handles nodes with zero data
+    size correctly, ensuring they don't occupy any space in the
+    visualization.
+    """
+    leaf = TMTree('nodata', [], 0)
+    leaf.update_rectangles((0, 0, 100, 100))
+    assert leaf.rect == (0, 0, 0, 0)
 
-class TestTMTreeRectangles(unittest.TestCase):
 
-    def test_single_leaf_update_rectangles(self) -> None:
-        """This test checks that update_rectangles correctly sets the rectangle
-        for a single leaf node, ensuring it occupies the entire given space.
-        """
-        leaf = TMTree('single leaf', [], 5)
-        leaf.update_rectangles((0, 0, 100, 200))
-        assert leaf.rect == (0, 0, 100, 200)
-
-    def test_zero_data_size_update_rectangles(self) -> None:
-        """This test checks that update_rectangles handles nodes with zero data
-        size correctly, ensuring they don't occupy any space in the
-        visualization.
-        """
-        leaf = TMTree('nodata', [], 0)
-        leaf.update_rectangles((0, 0, 100, 100))
-        assert leaf.rect == (0, 0, 0, 0)
+def test_get_rectangles_empty_tree() -> None:
+    """This test checks that get_rectangles returns an empty list for an
+    empty tree, ensuring no rectangles are generated.
+    """
+    empty_tree = TMTree('', [], 0)
+    assert empty_tree.get_rectangles() == []
 
-    def test_get_rectangles_empty_tree(self) -> None:
-        """This test checks that get_rectangles returns an empty list for an
-        empty tree, ensuring no rectangles are generated.
-        """
-        empty_tree = TMTree('', [], 0)
-        assert empty_tree.get_rectangles() == []
 
-    def test_division_by_zero(self) -> None:
-        """Test that update_rectangles does not cause a division by zero error
-        in a simple tree with a single file with zero data size.
-        """
-        leaf = TMTree("leaf", [], 0)
-        root = TMTree("root", [leaf], 0)
+def test_get_rectangles_after_changes() -> None:
+    """Test that get_rectangles reflects expanding, collapsing, resizing
+    and deleting trees after it has already been called.
+    """
+    leaf1 = TMTree("leaf1", [], 20)
+    leaf2 = TMTree("leaf2", [], 30)
+    child = TMTree("child", [leaf1, leaf2], 50)
+    root = TMTree("root", [child], 50)
+    root.update_rectangles((0, 0, 100, 50))
+    assert root.get_rectangles() == [((0, 0, 100, 50), root._colour)]
 
-        rect = (0, 0, 100, 100)
-        root.update_rectangles(rect)
+    root.expand_all()
+    assert [r for r, _ in root.get_rectangles()] == [(0, 0, 40, 50),
+                                                     (40, 0, 60, 50)]
 
-        self.assertEqual(root.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf.rect, (0, 0, 0, 0))
+    leaf2.change_size(0.5)
+    root.update_rectangles((0, 0, 100, 50))
+    assert [r for r, _ in root.get_rectangles()] == [(0, 0, 30, 50),
+                                                     (30, 0, 70, 50)]
 
-    def test_division_by_zero_complex(self) -> None:
-        """Test that update_rectangles does not cause a division by zero error
-        in a complex tree structure with multiple nested folders and files,
-        all with zero data size.
-        """
-        leaf1 = TMTree("leaf1", [], 0)
-        leaf2 = TMTree("leaf2", [], 0)
-        folder1 = TMTree("folderA", [leaf1, leaf2], 0)
-
-        leaf3 = TMTree("leaf3", [], 0)
-        leaf4 = TMTree("leaf4", [], 0)
-        folder2 = TMTree("folderB", [leaf3, leaf4], 0)
-
-        root = TMTree("root", [folder1, folder2], 0)
-
-        rect = (0, 0, 100, 100)
-        root.update_rectangles(rect)
-
-        self.assertEqual(root.rect, (0, 0, 0, 0))
-        self.assertEqual(folder1.rect, (0, 0, 0, 0))
-        self.assertEqual(folder2.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf1.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf2.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf3.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf4.rect, (0, 0, 0, 0))
-
-    def test_division_by_zero_complex_2(self) -> None:
-        """Test that update_rectangles does not cause a division by zero error
-        in a complex tree structure with multiple nested folders and files,
-        all with zero data size.
-        """
-        leaf1 = TMTree("leaf1", [], 0)
-        leaf2 = TMTree("leaf2", [], 0)
-        folder1 = TMTree("folder1", [leaf1, leaf2], 0)
-
-        leaf3 = TMTree("leaf3", [], 0)
-        leaf4 = TMTree("leaf4", [], 0)
-        folder2 = TMTree("folder2", [leaf3, leaf4], 0)
-
-        leaf5 = TMTree("leaf5", [], 0)
-        leaf6 = TMTree("leaf6", [], 0)
-        folder3 = TMTree("folder3", [leaf5, leaf6], 0)
-
-        root = TMTree("root", [folder1, folder2, folder3], 0)
-
-        rect = (0, 0, 100, 100)
-        root.update_rectangles(rect)
-
-        self.assertEqual(root.rect, (0, 0, 0, 0))
-        self.assertEqual(folder1.rect, (0, 0, 0, 0))
-        self.assertEqual(folder2.rect, (0, 0, 0, 0))
-        self.assertEqual(folder3.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf1.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf2.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf3.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf4.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf5.rect, (0, 0, 0, 0))
-        self.assertEqual(leaf6.rect, (0, 0, 0, 0))
-
-    def test_negative_heights(self) -> None:
-        """Test the update_rectangles method with negative heights.
-        """
-        leaf1 = TMTree("leaf1", [], 20)
-        leaf2 = TMTree("leaf2", [], 30)
-        leaf3 = TMTree("leaf3", [], 50)
-        child1 = TMTree("child1", [leaf1, leaf2], 50)
-        child2 = TMTree("child2", [leaf3], 50)
-        root = TMTree("root", [child1, child2], 100)
-        root.update_rectangles((0, 0, 200, -100))
-        root.expand_all()
+    leaf1.delete_self()
+    root.update_rectangles((0, 0, 100, 50))
+    assert [r for r, _ in root.get_rectangles()] == [(0, 0, 100, 50)]
 
-        assert root.rect == (0, 0, 200, -100)
-        assert child1.rect == (0, 0, 100, -100)
-        assert leaf1.rect == (0, 0, 40, -100)
-        assert leaf2.rect == (40, 0, 60, -100)
-        assert child2.rect == (100, 0, 100, -100)
-        assert leaf3.rect == (100, 0, 100, -100)
+    leaf2.collapse()
+    assert root.get_rectangles() == [((0, 0, 100, 50), child._colour)]
 
-        rects = root.get_rectangles()
-        expected = [(0, 0, 40, -100), (40, 0, 60, -100), (100, 0, 100, -100)]
-        for i in range(len(rects)):
-            assert rects[i][0] == expected[i]
 
+def test_negative_heights() -> None:
+    """Test the update_rectangles method with negative heights.
+    """
+    leaf1 = TMTree("leaf1", [], 20)
+    leaf2 = TMTree("leaf2", [], 30)
+    leaf3 = TMTree("leaf3", [], 50)
+    child1 = TMTree("child1", [leaf1, leaf2], 50)
+    child2 = TMTree("child2", [leaf3], 50)
+    root = TMTree("root", [child1, child2], 100)
+    root.update_rectangles((0, 0, 200, -100))
+    root.expand_all()
+
+    assert root.rect == (0, 0, 200, -100)
+    assert child1.rect == (0, 0, 100, -100)
+    assert leaf1.rect == (0, 0, 40, -100)
+    assert leaf2.rect == (40, 0, 60, -100)
+    assert child2.rect == (100, 0, 100, -100)
+    assert leaf3.rect == (100, 0, 100, -100)
+
+    rects = root.get_rectangles()
+    expected = [(0, 0, 40, -100), (40, 0, 60, -100), (100, 0, 100, -100)]
+    for i in range(len(rects)):
+        assert rects[i][0] == expected[i]
+
+
+def _zero_tree(shape: Union[int, tuple]) -> TMTree:
+    """Return a tree whose nodes all have a data size of 0.
+
+    If <shape> is an int, the tree is a folder of that many leaves. Otherwise,
+    it is a folder with a subtree of each shape in <shape>.
+    """
+    if isinstance(shape, int):
+        subtrees = [TMTree(f'leaf{i}', [], 0) for i in range(shape)]
+    else:
+        subtrees = [_zero_tree(subshape) for subshape in shape]
+    return TMTree('folder', subtrees, 0)
+
+
+@pytest.mark.parametrize('shape', [1, (2, 2), (2, 2, 2)],
+                         ids=['single_leaf', 'complex', 'complex_2'])
+def test_division_by_zero(shape: Union[int, tuple]) -> None:
+    """Test that update_rectangles does not cause a division by zero error
+    in a tree, with a single file or with nested folders and files, whose
+    nodes all have zero data size.
+    """
+    root = _zero_tree(shape)
+    root.update_rectangles((0, 0, 100, 100))
 
-class TestGetTreeAtPosition(unittest.TestCase):
-    def setUp(self) -> None:
-        """Set up a sample tree for testing.
-        """
-        self.leaf1 = TMTree('leaf1', [], 2)
-        self.leaf2 = TMTree('leaf2', [], 3)
-        self.child = TMTree('child', [self.leaf1, self.leaf2], 5)
-        self.root = TMTree('root', [self.child], 5)
-        self.root.update_rectangles((0, 0, 100, 100))
+    trees = [root]
+    for tree in trees:
+        assert tree.rect == (0, 0, 0, 0)
+        trees.extend(tree._subtrees)
 
-    def test_position_outside_tree(self) -> None:
-        """Test that the method returns None when the position is outside the
-        tree's rectangle.
-        """
-        assert self.root.get_tree_at_position((-10, -10)) is None
-        assert self.root.get_tree_at_position((150, 150)) is None
 
-    def test_empty_tree(self) -> None:
-        """Test that the method returns None for an empty tree.
-        """
-        empty_tree = TMTree('', [], 0)
-        assert empty_tree.get_tree_at_position((10, 10)) is None
-
-    def test_position_out_of_bounds(self) -> None:
-        """Test that get_tree_at_position returns None when the position is outside
-        the bounds of the tree's rectangle."""
-        leaf = TMTree("leaf", [], 100)
-        root = TMTree("root", [leaf], 0)
-        root.update_rectangles((0, 0, 100, 100))
-        self.assertIsNone(root.get_tree_at_position((150, 150)))
-
-    def test_multiple_leaves_expanded(self) -> None:
-        """Test that a single expanded leaf returns None when its position is
-        queried, as it should not be considered a tree at that position.
-        """
-        leaf1 = TMTree("leaf1", [], 20)
-        leaf2 = TMTree("leaf2", [], 30)
-        leaf3 = TMTree("leaf3", [], 50)
-        root = TMTree("root", [leaf1, leaf2, leaf3], 0)
-        root.update_rectangles((0, 0, 100, 100))
-        root.expand()
-        self.assertEqual(root.get_tree_at_position((10, 10)), leaf1)
-        self.assertEqual(root.get_tree_at_position((40, 40)), leaf2)
-        self.assertEqual(root.get_tree_at_position((80, 80)), leaf3)
-
-    def test_corner_case_top_left(self) -> None:
-        """Test that the correct leaf is returned when querying the top-left
-        corner of the rectangle, ensuring that boundary conditions are
-        handled correctly.
-        """
-        leaf1 = TMTree("leaf1", [], 40)
-        leaf2 = TMTree("leaf2", [], 60)
-        root = TMTree("root", [leaf1, leaf2], 0)
-        root.update_rectangles((0, 0, 100, 100))
-        root.expand()
-        self.assertEqual(root.get_tree_at_position((0, 0)), leaf1)
+def _position_tree() -> TMTree:
+    """Return a new sample tree for testing, laid out in a 100 by 100 square.
+    """
+    leaf1 = TMTree('leaf1', [], 2)
+    leaf2 = TMTree('leaf2', [], 3)
+    child = TMTree('child', [leaf1, leaf2], 5)
+    root = TMTree('root', [child], 5)
+    root.update_rectangles((0, 0, 100, 100))
+    return root
+
+
+@pytest.fixture(scope='module')
+def base_position_tree() -> TMTree:
+    """Return the sample tree, built once and shared by every test that uses
+    it, so tests that change it must use position_tree instead.
+    """
+    return _position_tree()
 
-    def test_corner_case_bottom_right(self) -> None:
-        """Test that the correct leaf is returned when querying the
-        bottom-right corner of the rectangle, ensuring that boundary conditions
-        are handled correctly.
-        """
-        leaf1 = TMTree("leaf1", [], 50)
-        leaf2 = TMTree("leaf2", [], 50)
-        root = TMTree("root", [leaf1, leaf2], 0)
-        root.update_rectangles((0, 0, 100, 100))
-        root.expand()
-        self.assertEqual(root.get_tree_at_position((99, 99)), leaf2)
 
+@pytest.fixture
+def position_tree() -> TMTree:
+    """Return a new sample tree that a test is free to change.
+    """
+    return _position_tree()
 
-class TestUpdateSize(unittest.TestCase):
-    def test_leaf_increase_size(self) -> None:
-        """Test increasing the size of a leaf and updating its data size.
-        """
-        leaf = TMTree("leaf", [], 50)
-        leaf.change_size(0.2)
-        leaf.update_data_sizes()
-        self.assertEqual(leaf.data_size, 60)
 
-    def test_leaf_decrease_size(self) -> None:
-        """Test decreasing the size of a leaf and updating its data size.
-        """
-        leaf = TMTree("leaf", [], 50)
-        leaf.change_size(-0.2)
-        leaf.update_data_sizes()
-        self.assertEqual(leaf.data_size, 40)
+def test_position_outside_tree(base_position_tree: TMTree) -> None:
+    """Test that the method returns None when the position is outside the
+    tree's rectangle.
+    """
+    assert base_position_tree.get_tree_at_position((-10, -10)) is None
+    assert base_position_tree.get_tree_at_position((150, 150)) is None
 
-    def test_folder_single_leaf(self) -> None:
-        """Test updating the data size of a folder containing a single leaf.
-        """
-        leaf = TMTree("leaf", [], 50)
-        folder = TMTree("folder", [leaf], 0)
-        leaf.change_size(0.1)
-        folder.update_data_sizes()
-        self.assertEqual(folder.data_size, 55)
-
-    def test_folder_multiple_leaves(self) -> None:
-        """Test updating the data size of a folder containing multiple leaves.
-        """
-        leaf1 = TMTree("leaf1", [], 50)
-        leaf2 = TMTree("leaf2", [], 60)
-        folder = TMTree("folder", [leaf1, leaf2], 0)
-        leaf1.change_size(0.2)
-        leaf2.change_size(-0.1)
-        folder.update_data_sizes()
-        self.assertEqual(folder.data_size, 114)
-
-    def test_nested_folders(self) -> None:
-        """Test updating the data size of nested folders.
-        """
-        leaf1 = TMTree("leaf1", [], 50)
-        leaf2 = TMTree("leaf2", [], 60)
-        subfolder = TMTree("subfolder", [leaf1, leaf2], 0)
-        leaf3 = TMTree("leaf3", [], 70)
-        folder = TMTree("folder", [subfolder, leaf3], 0)
-        leaf1.change_size(0.1)
-        leaf2.change_size(-0.1)
-        leaf3.change_size(0.2)
-        folder.update_data_sizes()
-        self.assertEqual(folder.data_size, 193)
-        self.assertEqual(subfolder.data_size, 109)
-
-    def test_empty_folder(self) -> None:
-        """Test updating the data size of an empty folder.
-        """
-        folder = TMTree("folder", [], 0)
-        folder.update_data_sizes()
-        self.assertEqual(folder.data_size, 0)
 
-    def test_folder_with_empty_subfolders(self) -> None:
-        """Test updating the data size of a folder with empty subfolders.
-        """
-        subfolder1 = TMTree("subfolder1", [], 0)
-        subfolder2 = TMTree("subfolder2", [], 0)
-        folder = TMTree("folder", [subfolder1, subfolder2], 0)
-        folder.update_data_sizes()
-        self.assertEqual(folder.data_size, 0)
-
-    def test_multi_nested_folders(self) -> None:
-        """Test updating the data size of multi-nested folders.
-        """
-        leaf = TMTree("leaf", [], 10)
-        level1 = TMTree("level1", [leaf], 0)
-        level2 = TMTree("level2", [level1], 0)
-        level3 = TMTree("level3", [level2], 0)
-        level3.update_data_sizes()
-        self.assertEqual(level3.data_size, 10)
-        self.assertEqual(level2.data_size, 10)
-        self.assertEqual(level1.data_size, 10)
-
-    def test_uneven_subtrees(self) -> None:
-        """Test updating the data size of a folder with unevenly sized subtrees.
-        """
-        small_leaf = TMTree("small_leaf", [], 1)
-        large_leaf = TMTree("large_leaf", [], 1000)
-        folder = TMTree("folder", [small_leaf, large_leaf], 0)
-        small_leaf.change_size(0.5)
-        large_leaf.change_size(-0.2)
-        folder.update_data_sizes()
-        self.assertEqual(folder.data_size, 802)
-
-    def test_subtrees_of_size_zero(self) -> None:
-        """Test updating the data size of a folder with subtrees whose data size
-        is zero.
-        """
-        zero_leaf = TMTree("zero_leaf", [], 0)
-        non_zero_leaf = TMTree("non_zero_leaf", [], 50)
-        folder = TMTree("folder", [zero_leaf, non_zero_leaf], 0)
-        non_zero_leaf.change_size(-0.2)
-        folder.update_data_sizes()
-        self.assertEqual(folder.data_size, 40)
+def test_empty_tree() -> None:
+    """Test that the method returns None for an empty tree.
+    """
+    empty_tree = TMTree('', [], 0)
+    assert empty_tree.get_tree_at_position((10, 10)) is None
 
 
-class TestChangeSize(unittest.TestCase):
-    def test_increase_leaf_size(self) -> None:
-        """Test increasing the size of a leaf.
-        """
-        leaf = TMTree("leaf", [], 50)
-        leaf.change_size(0.1)
-        leaf.update_data_sizes()
-        self.assertEqual(leaf.data_size, 55)
+def test_position_out_of_bounds() -> None:
+    """Test that get_tree_at_position returns None when the position is outside
+    the bounds of the tree's rectangle."""
+    leaf = TMTree("leaf", [], 100)
+    root = TMTree("root", [leaf], 0)
+    root.update_rectangles((0, 0, 100, 100))
+    assert root.get_tree_at_position((150, 150)) is None
 
-    def test_decrease_leaf_size(self) -> None:
-        """Test decreasing the size of a leaf.
-        """
-        leaf = TMTree("leaf", [], 50)
-        leaf.change_size(-0.1)
-        leaf.update_data_sizes()
-        self.assertEqual(leaf.data_size, 45)
 
-    def test_zero_change_leaf_size(self) -> None:
-        """Test changing the size of a leaf by zero percent.
-        """
-        leaf = TMTree("leaf", [], 50)
-        leaf.change_size(0)
-        leaf.update_data_sizes()
-        self.assertEqual(leaf.data_size, 50)
+def test_multiple_leaves_expanded() -> None:
+    """Test that a single expanded leaf returns None when its position is
+    queried, as it should not be considered a tree at that position.
+    """
+    leaf1 = TMTree("leaf1", [], 20)
+    leaf2 = TMTree("leaf2", [], 30)
+    leaf3 = TMTree("leaf3", [], 50)
+    root = TMTree("root", [leaf1, leaf2, leaf3], 0)
+    root.update_rectangles((0, 0, 100, 100))
+    root.expand()
+    assert root.get_tree_at_position((10, 10)) == leaf1
+    assert root.get_tree_at_position((40, 40)) == leaf2
+    assert root.get_tree_at_position((80, 80)) == leaf3
+
+
+def test_corner_case_top_left() -> None:
+    """Test that the correct leaf is returned when querying the top-left
+    corner of the rectangle, ensuring that boundary conditions are
+    handled correctly.
+    """
+    leaf1 = TMTree("leaf1", [], 40)
+    leaf2 = TMTree("leaf2", [], 60)
+    root = TMTree("root", [leaf1, leaf2], 0)
+    root.update_rectangles((0, 0, 100, 100))
+    root.expand()
+    assert root.get_tree_at_position((0, 0)) == leaf1
+
+
+def test_corner_case_bottom_right() -> None:
+    """Test that the correct leaf is returned when querying the
+    bottom-right corner of the rectangle, ensuring that boundary conditions
+    are handled correctly.
+    """
+    leaf1 = TMTree("leaf1", [], 50)
+    leaf2 = TMTree("leaf2", [], 50)
+    root = TMTree("root", [leaf1, leaf2], 0)
+    root.update_rectangles((0, 0, 100, 100))
+    root.expand()
+    assert root.get_tree_at_position((99, 99)) == leaf2
 
-    def test_increase_leaf_size_boundary(self) -> None:
-        """Test increasing the size of a leaf by the maximum allowed factor.
-        """
-        leaf = TMTree("leaf", [], 50)
-        leaf.change_size(0.99)
-        leaf.update_data_sizes()
-        self.assertEqual(leaf.data_size, 100)
 
-    def test_decrease_leaf_size_boundary(self) -> None:
-        """Test decreasing the size of a leaf by the maximum allowed factor.
-        """
-        leaf = TMTree("leaf", [], 50)
-        leaf.change_size(-0.99)
-        leaf.update_data_sizes()
-        self.assertEqual(leaf.data_size, 1)
+def test_same_leftmost_then_topmost() -> None:
+    """Test that _same picks the leftmost tree, using the topmost one only
+    to break ties, regardless of the order of the trees.
+    """
+    left = TMTree("left", [], 1)
+    left.rect = (0, 50, 10, 10)
+    top = TMTree("top", [], 1)
+    top.rect = (10, 0, 10, 10)
+    above = TMTree("above", [], 1)
+    above.rect = (0, 20, 10, 10)
+    assert _same([left, top]) is left
+    assert _same([top, left]) is left
+    assert _same([top, left, above]) is above
+    assert _same([top]) is top
+    assert _same([]) is None
+
+
+def test_nested_expanded_folders(position_tree: TMTree) -> None:
+    """Test that the position is resolved through every expanded level of
+    the tree, and stops at a folder that is not expanded.
+    """
+    root = position_tree
+    child = root._subtrees[0]
+    leaf1, leaf2 = child._subtrees
+    root.expand()
+    assert root.get_tree_at_position((50, 50)) is child
+    child.expand()
+    assert root.get_tree_at_position((50, 10)) is leaf1
+    assert root.get_tree_at_position((50, 90)) is leaf2
+
+
+def test_leaf_increase_size() -> None:
+    """Test increasing the size of a leaf and updating its data size.
+    """
+    leaf = TMTree("leaf", [], 50)
+    leaf.change_size(0.2)
+    leaf.update_data_sizes()
+    assert leaf.data_size == 60
 
-    def test_change_size_on_folder(self) -> None:
-        """Test changing the size of a folder, which should have no effect.
-        """
-        leaf = TMTree("leaf", [], 50)
-        folder = TMTree("folder", [leaf], 0)
-        folder.change_size(0.1)
-        folder.update_data_sizes()
-        self.assertEqual(folder.data_size, 50)
-        self.assertEqual(leaf.data_size, 50)
-
-    def test_change_size_on_nested_folders(self) -> None:
-        """Test changing the size of a leaf in a nested folder structure.
-        """
-        leaf1 = TMTree("leaf1", [], 50)
-        leaf2 = TMTree("leaf2", [], 60)
-        folder1 = TMTree("folder1", [leaf1], 0)
-        folder2 = TMTree("folder2", [leaf2], 0)
-        root = TMTree("root", [folder1, folder2], 0)
-        leaf1.change_size(0.1)
-        leaf2.change_size(-0.1)
-        root.update_data_sizes()
-        self.assertEqual(leaf1.data_size, 55)
-        self.assertEqual(leaf2.data_size, 54)
-        self.assertEqual(folder1.data_size, 55)
-        self.assertEqual(folder2.data_size, 54)
-        self.assertEqual(root.data_size, 109)
-
-    def test_change_size_on_nested_folders_complex(self) -> None:
-        """Test changing the size of leaves in a multi-nested folder structure.
-        """
-        leaf1 = TMTree("leaf1", [], 50)
-        leaf2 = TMTree("leaf2", [], 60)
-        leaf3 = TMTree("leaf3", [], 70)
-        leaf4 = TMTree("leaf4", [], 80)
-
-        subfolder1 = TMTree("subfolder1", [leaf1, leaf2], 0)
-        subfolder2 = TMTree("subfolder2", [leaf3], 0)
-        folder1 = TMTree("folder1", [subfolder1], 0)
-        folder2 = TMTree("folder2", [subfolder2, leaf4], 0)
-        root = TMTree("root", [folder1, folder2], 0)
-
-        leaf1.change_size(0.1)
-        leaf2.change_size(-0.1)
-        leaf3.change_size(0.2)
-        leaf4.change_size(-0.2)
-
-        root.update_data_sizes()
-
-        self.assertEqual(leaf1.data_size, 55)
-        self.assertEqual(leaf2.data_size, 54)
-        self.assertEqual(leaf3.data_size, 84)
-        self.assertEqual(leaf4.data_size, 64)
-        self.assertEqual(subfolder1.data_size, 109)
-        self.assertEqual(subfolder2.data_size, 84)
-        self.assertEqual(folder1.data_size, 109)
-        self.assertEqual(folder2.data_size, 148)
-        self.assertEqual(root.data_size, 257)
-
-    def test_change_size_empty_folder(self) -> None:
-        """Test changing the size of an empty folder.
-        """
-        folder = TMTree("folder", [], 0)
-        folder.change_size(0.1)
-        folder.update_data_sizes()
-        self.assertEqual(folder.data_size, 0)
 
-    def test_reduce_size_below_zero(self) -> None:
-        """Test reducing the size of a node to zero or negative.
-        """
-        leaf = TMTree('leaf', [], 2)
-        leaf.change_size(-100)
-        leaf.update_data_sizes()
-        self.assertEqual(leaf.data_size, 1)
+def test_leaf_decrease_size() -> None:
+    """Test decreasing the size of a leaf and updating its data size.
+    """
+    leaf = TMTree("leaf", [], 50)
+    leaf.change_size(-0.2)
+    leaf.update_data_sizes()
+    assert leaf.data_size == 40
 
-    def test_change_size_multi_nested_folder(self) -> None:
-        """Test changing the size of a leaf in a multi-nested folder.
-        """
-        leaf = TMTree('leaf', [], 10)
-        child = TMTree('child', [leaf], 10)
-        parent = TMTree('parent', [child], 10)
-        root = TMTree('root', [parent], 10)
-        leaf.change_size(0.5)
-        root.update_data_sizes()
-        self.assertEqual(leaf.data_size, 15)
-        self.assertEqual(child.data_size, 15)
-        self.assertEqual(parent.data_size, 15)
-        self.assertEqual(root.data_size, 15)
-
-
-class TestMove(unittest.TestCase):
-    def setUp(self) -> None:
-        """Set up a sample tree for testing.
-        """
-        self.leaf1 = TMTree('leaf1', [], 2)
-        self.leaf2 = TMTree('leaf2', [], 3)
-        self.child1 = TMTree('child1', [self.leaf1], 2)
-        self.child2 = TMTree('child2', [self.leaf2], 3)
-        self.root = TMTree('root', [self.child1, self.child2], 5)
 
-    def test_move_leaf(self) -> None:
-        """Test moving a leaf from one node to another.
-        """
-        self.leaf1.move(self.child2)
-        assert self.leaf1 in self.child2._subtrees
-        assert self.leaf1 not in self.child1._subtrees
+def test_folder_single_leaf() -> None:
+    """Test updating the data size of a folder containing a single leaf.
+    """
+    leaf = TMTree("leaf", [], 50)
+    folder = TMTree("folder", [leaf], 0)
+    leaf.change_size(0.1)
+    folder.update_data_sizes()
+    assert folder.data_size == 55
 
-    def test_move_updates_sizes(self) -> None:
-        """Test that moving a leaf updates the data sizes correctly.
-        """
-        self.leaf1.move(self.child2)
-        assert self.child1.data_size == 0
-        assert self.child2.data_size == 5
-        assert self.root.data_size == 5
 
-    def test_move_leaf_to_another_folder(self) -> None:
-        """Test moving a leaf from one folder to another.
-        """
-        leaf1 = TMTree("leaf1", [], 30)
-        leaf2 = TMTree("leaf2", [], 40)
-        folder1 = TMTree("folder1", [leaf1], 0)
-        folder2 = TMTree("folder2", [leaf2], 0)
-        root = TMTree("root", [folder1, folder2], 0)
-
-        leaf1.move(folder2)
-        root.update_data_sizes()
-
-        self.assertEqual(leaf1._parent_tree, folder2)
-        self.assertIn(leaf1, folder2._subtrees)
-        self.assertNotIn(leaf1, folder1._subtrees)
-        self.assertEqual(folder2.data_size, 70)
-        self.assertEqual(folder1.data_size, 0)
-
-    def test_move_folder_to_root(self) -> None:
-        """Test moving a folder to the root of the tree.
-        """
-        leaf1 = TMTree("leaf1", [], 30)
-        folder1 = TMTree("folder1", [leaf1], 0)
-        root = TMTree("root", [folder1], 0)
+def test_folder_multiple_leaves() -> None:
+    """Test updating the data size of a folder containing multiple leaves.
+    """
+    leaf1 = TMTree("leaf1", [], 50)
+    leaf2 = TMTree("leaf2", [], 60)
+    folder = TMTree("folder", [leaf1, leaf2], 0)
+    leaf1.change_size(0.2)
+    leaf2.change_size(-0.1)
+    folder.update_data_sizes()
+    assert folder.data_size == 114
 
-        folder1.move(root)
-        root.update_data_sizes()
 
-        self.assertEqual(folder1._parent_tree, root)
-        self.assertIn(folder1, root._subtrees)
-        self.assertEqual(root.data_size, 30)
+def test_nested_folders() -> None:
+    """Test updating the data size of nested folders.
+    """
+    leaf1 = TMTree("leaf1", [], 50)
+    leaf2 = TMTree("leaf2", [], 60)
+    subfolder = TMTree("subfolder", [leaf1, leaf2], 0)
+    leaf3 = TMTree("leaf3", [], 70)
+    folder = TMTree("folder", [subfolder, leaf3], 0)
+    leaf1.change_size(0.1)
+    leaf2.change_size(-0.1)
+    leaf3.change_size(0.2)
+    folder.update_data_sizes()
+    assert folder.data_size == 193
+    assert subfolder.data_size == 109
+
+
+def test_empty_folder() -> None:
+    """Test updating the data size of an empty folder.
+    """
+    folder = TMTree("folder", [], 0)
+    folder.update_data_sizes()
+    assert folder.data_size == 0
 
-    def test_move_folder_to_itself(self) -> None:
-        """Test attempting to move a folder to itself (should do nothing).
-        """
-        leaf1 = TMTree("leaf1", [], 30)
-        folder1 = TMTree("folder1", [leaf1], 0)
 
-        original_folder1 = folder1
-        folder1.move(folder1)
+def test_folder_with_empty_subfolders() -> None:
+    """Test updating the data size of a folder with empty subfolders.
+    """
+    subfolder1 = TMTree("subfolder1", [], 0)
+    subfolder2 = TMTree("subfolder2", [], 0)
+    folder = TMTree("folder", [subfolder1, subfolder2], 0)
+    folder.update_data_sizes()
+    assert folder.data_size == 0
 
-        self.assertEqual(folder1, original_folder1)
-        self.assertIn(leaf1, folder1._subtrees)
-        self.assertEqual(folder1.data_size, 30)
 
-    def test_move_subtree_to_leaf(self) -> None:
-        """Test attempting to move a subtree to a leaf (should do nothing).
-        """
-        self.leaf1 = TMTree('leaf1', [], 2)
-        self.leaf2 = TMTree('leaf2', [], 3)
-        self.leaf3 = TMTree('leaf3', [], 5)
-        self.child1 = TMTree('child1', [self.leaf1, self.leaf2], 5)
-        self.child2 = TMTree('child2', [self.leaf3], 5)
-        self.root = TMTree('root', [self.child1, self.child2], 10)
-        original_child1 = self.child1
-        self.child1.move(self.leaf3)
-        assert self.child1 == original_child1
-        assert self.leaf3._subtrees == []
-
-    def test_move_empty_folder_into_nested_folder(self) -> None:
-        """Test moving an empty folder into a nested folder structure.
-        """
-        empty_folder = TMTree('empty_folder', [])
-        leaf = TMTree('leaf', [], 10)
-        nested_folder1 = TMTree('nested_folder1', [leaf])
-        nested_folder2 = TMTree('nested_folder2', [nested_folder1])
-        root_folder = TMTree('root_folder', [empty_folder, nested_folder2])
+def test_update_data_sizes_multi_nested_folders() -> None:
+    """Test updating the data size of multi-nested folders.
+    """
+    leaf = TMTree("leaf", [], 10)
+    level1 = TMTree("level1", [leaf], 0)
+    level2 = TMTree("level2", [level1], 0)
+    level3 = TMTree("level3", [level2], 0)
+    level3.update_data_sizes()
+    assert level3.data_size == 10
+    assert level2.data_size == 10
+    assert level1.data_size == 10
+
+
+def test_uneven_subtrees() -> None:
+    """Test updating the data size of a folder with unevenly sized subtrees.
+    """
+    small_leaf = TMTree("small_leaf", [], 1)
+    large_leaf = TMTree("large_leaf", [], 1000)
+    folder = TMTree("folder", [small_leaf, large_leaf], 0)
+    small_leaf.change_size(0.5)
+    large_leaf.change_size(-0.2)
+    folder.update_data_sizes()
+    assert folder.data_size == 802
+
+
+def test_subtrees_of_size_zero() -> None:
+    """Test updating the data size of a folder with subtrees whose data size
+    is zero.
+    """
+    zero_leaf = TMTree("zero_leaf", [], 0)
+    non_zero_leaf = TMTree("non_zero_leaf", [], 50)
+    folder = TMTree("folder", [zero_leaf, non_zero_leaf], 0)
+    non_zero_leaf.change_size(-0.2)
+    folder.update_data_sizes()
+    assert folder.data_size == 40
 
-        empty_folder.move(nested_folder1)
 
-        assert empty_folder in nested_folder1._subtrees
+def test_deep_chain_of_folders() -> None:
+    """Test updating the data size of a chain of folders deeper than the
+    recursion limit.
+    """
+    leaf = TMTree("leaf", [], 10)
+    folder = leaf
+    for i in range(5000):
+        folder = TMTree(f"folder{i}", [folder], 0)
+    assert folder.data_size == 10
+    leaf.data_size = 20
+    assert folder.update_data_sizes() == 20
+    assert leaf._parent_tree.data_size == 20
 
-        assert empty_folder.data_size == 0
-        assert nested_folder1.data_size == 10
-        assert nested_folder2.data_size == 10
-        assert root_folder.data_size == 10
 
-        assert empty_folder not in root_folder._subtrees
+def _data_sizes(tree: TMTree) -> Dict[str, int]:
+    """Return the data size of <tree> and of each of its descendants, by name.
 
-    def test_move_node_to_itself(self) -> None:
-        """Test moving a node to itself.
-        """
-        leaf = TMTree('leaf', [], 289)
-        original_parent = leaf._parent_tree
-        leaf.move(leaf)
-        self.assertIs(leaf._parent_tree, original_parent)
-        self.assertEqual(leaf.data_size, 289)
-
-    def test_move_node_to_parent(self) -> None:
-        """Test moving a node to its parent.
-        """
-        leaf = TMTree('leaf', [], 33)
-        folder = TMTree('folder', [leaf], 33)
-        leaf.move(folder)
-        self.assertIn(leaf, folder._subtrees)
-        self.assertEqual(folder.data_size, 33)
-
-    def test_move_node_to_descendant(self) -> None:
-        """Test that moving a node to one of its descendants is not allowed.
-        """
-        leaf = TMTree("leaf", [], 10)
-        folder = TMTree("folder", [leaf], 10)
-        folder.move(leaf)
-        self.assertNotIn(folder, leaf._subtrees)
+    Precondition: the trees in <tree> all have different names.
+    """
+    sizes = {}
+    trees = [tree]
+    for subtree in trees:
+        sizes[subtree._name] = subtree.data_size
+        trees.extend(subtree._subtrees)
+    return sizes
 
 
-class TestExpand(unittest.TestCase):
+def test_change_size_on_folder() -> None:
+    """Test changing the size of a folder, which should have no effect.
+    """
+    leaf = TMTree("leaf", [], 50)
+    folder = TMTree("folder", [leaf], 0)
+    folder.change_size(0.1)
+    folder.update_data_sizes()
+    assert folder.data_size == 50
+    assert leaf.data_size == 50
 
-    def test_two_folders(self):
-        """Test that expanding one folder in a tree with two folders correctly
-        updates the expanded status of the root and both folders.
-        """
-        leaf = TMTree("leaf", [], 10)
-        leaf2 = TMTree("leaf2", [], 10)
-        folder1 = TMTree("folder1", [leaf], 0)
-        folder2 = TMTree("folder2", [leaf2], 0)
-        root = TMTree("root", [folder1, folder2], 0)
-        root.update_rectangles((0, 0, 100, 100))
-        root.expand()
-        folder1.expand()
-        self.assertEqual(root._expanded, True)
-        self.assertEqual(folder1._expanded, True)
-        self.assertEqual(folder2._expanded, False)
 
-    def test_four_folders(self):
-        """Test that expanding one folder in a tree with four folders correctly
-        updates the expanded status of the root and all folders.
-        """
-        leaf1 = TMTree("leaf1", [], 10)
-        folder1 = TMTree("folder1", [leaf1], 0)
-        leaf2 = TMTree("leaf2", [], 10)
-        folder2 = TMTree("folder2", [leaf2], 0)
-        leaf3 = TMTree("leaf3", [], 10)
-        folder3 = TMTree("folder3", [leaf3], 0)
-        leaf4 = TMTree("leaf4", [], 10)
-        folder4 = TMTree("folder4", [leaf4], 0)
-        root = TMTree("root", [folder1, folder2, folder3, folder4], 0)
-        root.update_rectangles((0, 0, 100, 100))
-        root.expand()
-        folder1.expand()
-        self.assertEqual(root._expanded, True)
-        self.assertEqual(folder1._expanded, True)
-        self.assertEqual(folder2._expanded, False)
-        self.assertEqual(folder3._expanded, False)
-        self.assertEqual(folder4._expanded, False)
-
-    def test_multi_nested_folders(self):
-        """Test that expand_all correctly expands all folders in a multi-nested
-        structure.
-        """
-        leaf = TMTree("leaf", [], 10)
-        folder1 = TMTree("folder1", [leaf], 0)
-        folder2 = TMTree("folder2", [folder1], 0)
-        folder3 = TMTree("folder3", [folder2], 0)
-        folder4 = TMTree("folder4", [folder3], 0)
-        root = TMTree("root", [folder4], 0)
-        root.update_rectangles((0, 0, 100, 100))
-        root.expand_all()
-        self.assertTrue(all(subtree._expanded for subtree in
-                            [root, folder1, folder2, folder3, folder4]))
+def test_change_size_on_nested_folders() -> None:
+    """Test changing the size of a leaf in a nested folder structure.
+    """
+    leaf1 = TMTree("leaf1", [], 50)
+    leaf2 = TMTree("leaf2", [], 60)
+    folder1 = TMTree("folder1", [leaf1], 0)
+    folder2 = TMTree("folder2", [leaf2], 0)
+    root = TMTree("root", [folder1, folder2], 0)
+    leaf1.change_size(0.1)
+    leaf2.change_size(-0.1)
+    root.update_data_sizes()
+    assert _data_sizes(root) == {
+        'leaf1': 55, 'leaf2': 54, 'folder1': 55, 'folder2': 54, 'root': 109}
+
+
+def test_change_size_on_nested_folders_complex() -> None:
+    """Test changing the size of leaves in a multi-nested folder structure.
+    """
+    leaf1 = TMTree("leaf1", [], 50)
+    leaf2 = TMTree("leaf2", [], 60)
+    leaf3 = TMTree("leaf3", [], 70)
+    leaf4 = TMTree("leaf4", [], 80)
 
-    def test_empty_folders(self):
-        """Test that expand_all correctly handles a tree with empty folders.
-        """
-        empty_folder1 = TMTree("empty_folder1", [], 0)
-        empty_folder2 = TMTree("empty_folder2", [], 0)
-        root = TMTree("root", [empty_folder1, empty_folder2], 0)
-        root.update_rectangles((0, 0, 100, 100))
-        root.expand_all()
-        self.assertTrue(root._expanded)
-        self.assertFalse(empty_folder1._expanded)
-        self.assertFalse(empty_folder2._expanded)
+    subfolder1 = TMTree("subfolder1", [leaf1, leaf2], 0)
+    subfolder2 = TMTree("subfolder2", [leaf3], 0)
+    folder1 = TMTree("folder1", [subfolder1], 0)
+    folder2 = TMTree("folder2", [subfolder2, leaf4], 0)
+    root = TMTree("root", [folder1, folder2], 0)
 
-    def test_expand_all_under_root(self):
-        """Test that expand_all correctly expands every node under the root.
-        """
-        leaf1 = TMTree("leaf1", [], 10)
-        leaf2 = TMTree("leaf2", [], 20)
-        folder1 = TMTree("folder1", [leaf1, leaf2], 0)
-        leaf3 = TMTree("leaf3", [], 30)
-        folder2 = TMTree("folder2", [leaf3], 0)
-        root = TMTree("root", [folder1, folder2], 0)
-        root.update_rectangles((0, 0, 100, 100))
-        root.expand_all()
-        self.assertTrue(root._expanded)
-        self.assertTrue(folder1._expanded)
-        self.assertTrue(folder2._expanded)
-        self.assertFalse(leaf1._expanded)
-        self.assertFalse(leaf2._expanded)
-        self.assertFalse(leaf3._expanded)
+    leaf1.change_size(0.1)
+    leaf2.change_size(-0.1)
+    leaf3.change_size(0.2)
+    leaf4.change_size(-0.2)
 
-    def test_expand_tree_after_collapsing(self):
-        """Test expanding a tree after it has been collapsed.
-        """
-        leaf1 = TMTree("leaf1", [], 10)
-        leaf2 = TMTree("leaf2", [], 20)
-        folder = TMTree("folder", [leaf1, leaf2], 30)
-        root = TMTree("root", [folder], 30)
+    root.update_data_sizes()
 
-        root.expand_all()
-        self.assertTrue(all(subtree._expanded for subtree in root._subtrees))
-        root.collapse_all()
-        self.assertFalse(any(subtree._expanded for subtree in root._subtrees))
-        root.expand_all()
-        self.assertTrue(all(subtree._expanded for subtree in root._subtrees))
+    assert _data_sizes(root) == {
+        'leaf1': 55, 'leaf2': 54, 'leaf3': 84, 'leaf4': 64,
+        'subfolder1': 109, 'subfolder2': 84, 'folder1': 109,
+        'folder2': 148, 'root': 257}
 
-    def test_expand_leaf(self) -> None:
-        """Test that expanding a leaf does nothing.
-        """
-        node = TMTree("node", [], 515)
-        node.expand()
-        self.assertFalse(node._expanded)
+
+def test_change_size_empty_folder() -> None:
+    """Test changing the size of an empty folder.
+    """
+    folder = TMTree("folder", [], 0)
+    folder.change_size(0.1)
+    folder.update_data_sizes()
+    assert folder.data_size == 0
+
+
+def test_change_size_multi_nested_folder() -> None:
+    """Test changing the size of a leaf in a multi-nested folder.
+    """
+    leaf = TMTree('leaf', [], 10)
+    child = TMTree('child', [leaf], 10)
+    parent = TMTree('parent', [child], 10)
+    root = TMTree('root', [parent], 10)
+    leaf.change_size(0.5)
+    root.update_data_sizes()
+    assert _data_sizes(root) == {
+        'leaf': 15, 'child': 15, 'parent': 15, 'root': 15}
+
+
+@pytest.mark.parametrize('size, factor, expected', [
+    (50, 0.1, 55),
+    (50, -0.1, 45),
+    (50, 0, 50),
+    (50, 0.99, 100),
+    (50, -0.99, 1),
+    (25, 0.28, 32),
+    (25, -0.28, 18),
+    (2, -100, 1),
+    (100, 1e-7, 101),
+    (0, 1e-7, 0),
+    (3373355, 0.4717016145248456, 4964572),
+    (50, Decimal('0.1'), 55),
+    (50, Fraction(1, 10), 55),
+])
+def test_change_leaf_size(size: int, factor: float, expected: int) -> None:
+    """Test changing the size of a leaf, including by zero percent, by the
+    maximum allowed factors, and by a factor that would reduce it below zero.
+
+    A change whose exact size is a whole number must not be rounded any further
+    by floating point error, and neither a tiny factor nor a large size may
+    round the wrong way. Factors need not be floats.
+    """
+    leaf = TMTree("leaf", [], size)
+    leaf.change_size(factor)
+    assert leaf.data_size == expected
+
+
+@pytest.fixture
+def move_tree() -> Callable[[], SimpleNamespace]:
+    """Return a function that builds a new sample tree, with two folders of
+    one leaf each, every time it is called.
+
+    The tree's nodes are the root, c1, c2, l1 and l2 attributes of the
+    namespace the function returns.
+    """
+    def build() -> SimpleNamespace:
+        l1, l2 = TMTree('leaf1', [], 2), TMTree('leaf2', [], 3)
+        c1, c2 = TMTree('child1', [l1], 2), TMTree('child2', [l2], 3)
+        root = TMTree('root', [c1, c2], 5)
+        return SimpleNamespace(root=root, c1=c1, c2=c2, l1=l1, l2=l2)
+
+    return build
+
+
+def test_move_leaf(move_tree: Callable[[], SimpleNamespace]) -> None:
+    """Test moving a leaf from one node to another.
+    """
+    t = move_tree()
+    t.l1.move(t.c2)
+    assert t.l1 in t.c2._subtrees
+    assert t.l1 not in t.c1._subtrees
+
+
+def test_move_updates_sizes(move_tree: Callable[[], SimpleNamespace]) -> None:
+    """Test that moving a leaf updates the data sizes correctly.
+    """
+    t = move_tree()
+    t.l1.move(t.c2)
+    assert t.c1.data_size == 0
+    assert t.c2.data_size == 5
+    assert t.root.data_size == 5
+
+
+def test_move_leaf_to_another_folder() -> None:
+    """Test moving a leaf from one folder to another.
+    """
+    leaf1 = TMTree("leaf1", [], 30)
+    leaf2 = TMTree("leaf2", [], 40)
+    folder1 = TMTree("folder1", [leaf1], 0)
+    folder2 = TMTree("folder2", [leaf2], 0)
+    root = TMTree("root", [folder1, folder2], 0)
+
+    leaf1.move(folder2)
+    root.update_data_sizes()
+
+    assert leaf1._parent_tree == folder2
+    assert leaf1 in folder2._subtrees
+    assert leaf1 not in folder1._subtrees
+    assert folder2.data_size == 70
+    assert folder1.data_size == 0
+
+
+def test_move_folder_to_root() -> None:
+    """Test moving a folder to the root of the tree.
+    """
+    leaf1 = TMTree("leaf1", [], 30)
+    folder1 = TMTree("folder1", [leaf1], 0)
+    root = TMTree("root", [folder1], 0)
+
+    folder1.move(root)
+    root.update_data_sizes()
+
+    assert folder1._parent_tree == root
+    assert folder1 in root._subtrees
+    assert root.data_size == 30
+
+
+def test_move_folder_to_itself() -> None:
+    """Test attempting to move a folder to itself (should do nothing).
+    """
+    leaf1 = TMTree("leaf1", [], 30)
+    folder1 = TMTree("folder1", [leaf1], 0)
+
+    original_folder1 = folder1
+    folder1.move(folder1)
+
+    assert folder1 == original_folder1
+    assert leaf1 in folder1._subtrees
+    assert folder1.data_size == 30
+
+
+def test_move_subtree_to_leaf() -> None:
+    """Test attempting to move a subtree to a leaf (should do nothing).
+    """
+    leaf1 = TMTree('leaf1', [], 2)
+    leaf2 = TMTree('leaf2', [], 3)
+    leaf3 = TMTree('leaf3', [], 5)
+    child1 = TMTree('child1', [leaf1, leaf2], 5)
+    child2 = TMTree('child2', [leaf3], 5)
+    TMTree('root', [child1, child2], 10)
+    original_child1 = child1
+    child1.move(leaf3)
+    assert child1 == original_child1
+    assert leaf3._subtrees == []
+
+
+def test_move_empty_folder_into_nested_folder() -> None:
+    """Test moving an empty folder into a nested folder structure.
+    """
+    empty_folder = TMTree('empty_folder', [])
+    leaf = TMTree('leaf', [], 10)
+    nested_folder1 = TMTree('nested_folder1', [leaf])
+    nested_folder2 = TMTree('nested_folder2', [nested_folder1])
+    root_folder = TMTree('root_folder', [empty_folder, nested_folder2])
+
+    empty_folder.move(nested_folder1)
+
+    assert empty_folder in nested_folder1._subtrees
+
+    assert empty_folder.data_size == 0
+    assert nested_folder1.data_size == 10
+    assert nested_folder2.data_size == 10
+    assert root_folder.data_size == 10
+
+    assert empty_folder not in root_folder._subtrees
+
+
+def test_move_node_to_itself() -> None:
+    """Test moving a node to itself.
+    """
+    leaf = TMTree('leaf', [], 289)
+    original_parent = leaf._parent_tree
+    leaf.move(leaf)
+    assert leaf._parent_tree is original_parent
+    assert leaf.data_size == 289
+
+
+def test_move_node_to_parent() -> None:
+    """Test moving a node to its parent.
+    """
+    leaf = TMTree('leaf', [], 33)
+    folder = TMTree('folder', [leaf], 33)
+    leaf.move(folder)
+    assert leaf in folder._subtrees
+    assert folder.data_size == 33
+
+
+def test_move_node_to_descendant() -> None:
+    """Test that moving a node to one of its descendants is not allowed.
+    """
+    leaf = TMTree("leaf", [], 10)
+    folder = TMTree("folder", [leaf], 10)
+    folder.move(leaf)
+    assert folder not in leaf._subtrees
+
+
+def _build_tree(depth: int, branching: int, size: int = 10) -> TMTree:
+    """Return a tree whose leaves are all <depth> levels below its root, in
+    which every folder has <branching> subtrees and every leaf has data size
+    <size>.
+    """
+    if depth == 0:
+        return TMTree('leaf', [], size)
+    subtrees = [_build_tree(depth - 1, branching, size)
+                for _ in range(branching)]
+    return TMTree(f'folder{depth}', subtrees, 0)
+
+
+@pytest.mark.parametrize('branching', [2, 4])
+def test_expand_one_folder(branching: int) -> None:
+    """Test that expanding one folder in a tree with several folders correctly
+    updates the expanded status of the root and every folder.
+    """
+    root = _build_tree(2, branching)
+    first, *others = root._subtrees
+    root.expand()
+    first.expand()
+    assert root._expanded is True
+    assert first._expanded is True
+    assert all(folder._expanded is False for folder in others)
+
+
+@pytest.mark.parametrize('depth, branching, size', [
+    (1, 2, 10),
+    (1, 4, 10),
+    (4, 1, 10),
+    (1, 0, 10),
+    (2, 2, 10),
+    (1, 2, 0),
+])
+def test_expand_all_shapes(depth: int, branching: int, size: int) -> None:
+    """Test that expand_all expands every folder in the tree, including nested
+    ones, and no leaf or empty folder.
+    """
+    root = _build_tree(depth, branching, size)
+    root.expand_all()
+    trees = [root]
+    for tree in trees:
+        assert tree._expanded is bool(tree._subtrees)
+        trees.extend(tree._subtrees)
+
+
+def test_expand_tree_after_collapsing():
+    """Test expanding a tree after it has been collapsed.
+    """
+    leaf1 = TMTree("leaf1", [], 10)
+    leaf2 = TMTree("leaf2", [], 20)
+    folder = TMTree("folder", [leaf1, leaf2], 30)
+    root = TMTree("root", [folder], 30)
+
+    root.expand_all()
+    assert all(subtree._expanded for subtree in root._subtrees)
+    root.collapse_all()
+    assert not any(subtree._expanded for subtree in root._subtrees)
+    root.expand_all()
+    assert all(subtree._expanded for subtree in root._subtrees)
+
+
+def test_expand_all_deep_chain() -> None:
+    """Test that expand_all and collapse_all handle a chain of folders
+    deeper than the recursion limit.
+    """
+    leaf = TMTree("leaf", [], 10)
+    root = leaf
+    for i in range(5000):
+        root = TMTree(f"folder{i}", [root], 0)
+    root.expand_all()
+    assert root._expanded
+    assert leaf._parent_tree._expanded
+    leaf.collapse_all()
+    assert not root._expanded
+    assert not leaf._parent_tree._expanded
+
+
+def test_expand_leaf() -> None:
+    """Test that expanding a leaf does nothing.
+    """
+    node = TMTree("node", [], 515)
+    node.expand()
+    assert not node._expanded
 
 
 class TestCollapse(unittest.TestCase):
@@ -793,7 +858,6 @@ class TestCollapse(unittest.TestCase):
 
 
 class TestCollapseAll(unittest.TestCase):
-
     def test_collapse_single_folder_with_leaf(self) -> None:
         """Test collapsing a single folder containing one leaf.
         """
@@ -806,15 +870,11 @@ class TestCollapseAll(unittest.TestCase):
     def test_collapse_nested_folders_with_leaves(self) -> None:
         """Test collapsing nested folders containing multiple leaves.
         """
-        leaf1 = TMTree("leaf1", [], 10)
-        leaf2 = TMTree("leaf2", [], 20)
-        child_folder = TMTree("child_folder", [leaf1, leaf2], 30)
-        root_folder = TMTree("root_folder", [child_folder], 30)
+        root_folder = TMTree("root_folder", [
+            TMTree("child_folder", [TMTree("leaf1", [], 10),
+                                    TMTree("leaf2", [], 20)], 30)], 30)
         root_folder.collapse_all()
-        self.assertFalse(root_folder._expanded)
-        self.assertFalse(child_folder._expanded)
-        self.assertFalse(leaf1._expanded)
-        self.assertFalse(leaf2._expanded)
+        self.assertFalse(any(_expanded_bits(root_folder)))
 
     def test_collapse_empty_folder(self) -> None:
         """Test collapsing an empty folder.
@@ -867,11 +927,7 @@ class TestCollapseAll(unittest.TestCase):
         level1_folder = TMTree("level1_folder", [level2_folder], 83)
         root_folder = TMTree("root_folder", [level1_folder], 83)
         root_folder.collapse_all()
-        self.assertFalse(root_folder._expanded)
-        self.assertFalse(level1_folder._expanded)
-        self.assertFalse(level2_folder._expanded)
-        self.assertFalse(level3_folder._expanded)
-        self.assertFalse(leaf._expanded)
+        self.assertFalse(any(_expanded_bits(root_folder)))
 
     def test_collapse_complex2(self) -> None:
         """Test collapsing a complex folder with a mix of leaves and subfolders.
@@ -881,95 +937,90 @@ class TestCollapseAll(unittest.TestCase):
         subfolder = TMTree("subfolder", [leaf2], 13)
         folder = TMTree("folder", [leaf1, subfolder], 34)
         folder.collapse_all()
-        self.assertFalse(folder._expanded)
-        self.assertFalse(leaf1._expanded)
-        self.assertFalse(subfolder._expanded)
-        self.assertFalse(leaf2._expanded)
+        self.assertFalse(any(_expanded_bits(folder)))
 
     def test_collapse_all_large_tree_structure(self) -> None:
         """Test collapsing all nodes in a large tree structure.
         """
-        root = TMTree("root", [], 0)
-        current_folder = root
-        for i in range(200):
-            new_folder = TMTree(f"folder{i}", [], 0)
-            current_folder._subtrees.append(new_folder)
-            current_folder = new_folder
+        # A chain of 200 folders below a root, built from the bottom up so
+        # that each folder is linked to its parent as it is adopted. The
+        # folders all share one colour tuple.
+        chain = reduce(lambda child, i: _mk(f"folder{i}", [child], 0),
+                       range(198, -1, -1), _mk("folder199", [], 0))
+        root = _mk("root", [chain], 0)
         root.expand_all()
         root.collapse_all()
-        self.assertFalse(root._expanded)
-        self.assertFalse(current_folder._expanded)
+        # The chain's heavy path is the whole chain
+        self.assertFalse(any(tree._expanded
+                             for tree in _walk_heavy_path(root)))
 
 
 class TestDeleteSelf(unittest.TestCase):
     def setUp(self) -> None:
         """Set up a sample tree for testing.
+
+        The tree is built afresh for each test, which is cheaper than copying
+        a prebuilt one.
         """
         self.leaf1 = TMTree('leaf1', [], 2)
         self.leaf2 = TMTree('leaf2', [], 3)
-        self.child = TMTree('child', [self.leaf1, self.leaf2], 5)
-        self.root = TMTree('root', [self.child], 5)
+        self.child = TMTree('child', (self.leaf1, self.leaf2), 5)
+        self.root = TMTree('root', (self.child,), 5)
 
     def test_delete_leaf(self) -> None:
         """Test deleting a leaf from its parent.
         """
-        self.leaf1.delete_self()
-        assert self.leaf1 not in self.child._subtrees
-        assert self.child.data_size == 3
-        assert self.leaf1.data_size == 0
+        self.assertIs(self.leaf1.delete_self(), True)
+        self.assertNotIn(self.leaf1, self.child._subtrees)
+        self.assertEqual(self.child.data_size, 3)
+        self.assertEqual(self.leaf1.data_size, 0)
 
     def test_delete_internal_node(self) -> None:
         """Test deleting an internal node from its parent.
         """
         self.child.delete_self()
-        assert self.child not in self.root._subtrees
-        assert self.root.data_size == 0
-        assert self.child.data_size == 0
+        self.assertNotIn(self.child, self.root._subtrees)
+        self.assertEqual(self.root.data_size, 0)
+        self.assertEqual(self.child.data_size, 0)
 
     def test_delete_internal_node_with_multiple_children(self) -> None:
         """Test deleting an internal node with multiple children.
         """
-        self.leaf1 = TMTree('leaf1', [], 2)
-        self.leaf2 = TMTree('leaf2', [], 3)
-        self.leaf3 = TMTree('leaf3', [], 5)
-        self.child1 = TMTree('child1', [self.leaf1, self.leaf2], 5)
-        self.child2 = TMTree('child2', [self.leaf3], 5)
-        self.root = TMTree('root', [self.child1, self.child2], 10)
-        self.child1.delete_self()
-        assert self.child1 not in self.root._subtrees
-        assert self.root.data_size == 5
+        child1 = TMTree('child1', (TMTree('leaf1', [], 2),
+                                   TMTree('leaf2', [], 3)), 5)
+        root = TMTree('root', (child1,
+                               TMTree('child2', (TMTree('leaf3', [], 5),), 5)),
+                      10)
+        child1.delete_self()
+        self.assertNotIn(child1, root._subtrees)
+        self.assertEqual(root.data_size, 5)
 
     def test_delete_root_node(self) -> None:
         """Test attempting to delete the root node (should do nothing).
         """
         original_root = self.root
         self.root.delete_self()
-        assert self.root == original_root
-        self.assertFalse(self.root.delete_self())
+        self.assertIs(self.root, original_root)
+        self.assertIs(self.root.delete_self(), False)
         self.assertEqual(self.root.data_size, 5)
 
     def test_delete_leaf_complex(self) -> None:
         """Test deleting a leaf node in a more complex structure.
         """
-        self.leaf1 = TMTree('leaf1', [], 2)
-        self.leaf2 = TMTree('leaf2', [], 3)
-        self.leaf3 = TMTree('leaf3', [], 5)
-        self.leaf4 = TMTree('leaf4', [], 7)
-        self.leaf5 = TMTree('leaf5', [], 11)
-
-        self.child1 = TMTree('child1', [self.leaf1, self.leaf2], 5)
-        self.child2 = TMTree('child2', [self.leaf3, self.leaf4], 12)
-        self.child3 = TMTree('child3', [self.leaf5], 11)
-
-        self.sub_root1 = TMTree('sub_root1', [self.child1, self.child2], 17)
-        self.sub_root2 = TMTree('sub_root2', [self.child3], 11)
-
-        self.root = TMTree('root', [self.sub_root1, self.sub_root2], 28)
-        self.leaf4.delete_self()
-        assert self.leaf4 not in self.child2._subtrees
-        assert self.child2.data_size == 5
-        assert self.sub_root1.data_size == 10
-        assert self.root.data_size == 21
+        leaf4 = TMTree('leaf4', [], 7)
+        child2 = TMTree('child2', (TMTree('leaf3', [], 5), leaf4), 12)
+        child1 = TMTree('child1', (TMTree('leaf1', [], 2),
+                                   TMTree('leaf2', [], 3)), 5)
+        sub_root1 = TMTree('sub_root1', (child1, child2), 17)
+        child3 = TMTree('child3', (TMTree('leaf5', [], 11),), 11)
+        root = TMTree('root', (sub_root1, TMTree('sub_root2', (child3,), 11)),
+                      28)
+
+        leaf4.delete_self()
+        self.assertNotIn(leaf4, child2._subtrees)
+        # The ancestors of leaf4, each with its data size once leaf4 is deleted
+        for ancestor, expected in [(child2, 5), (sub_root1, 10), (root, 21)]:
+            self.assertEqual(ancestor.data_size, expected)
 
     def test_delete_root_of_subtree(self):
         """Test deleting the root of a subtree and its impact on the tree
@@ -986,16 +1037,100 @@ class TestDeleteSelf(unittest.TestCase):
         self.assertEqual(folder.data_size, 10)
         self.assertEqual(root.data_size, 10)
 
+    def test_delete_leaf_with_identical_sibling(self) -> None:
+        """Test that deleting a leaf removes that leaf, and not a sibling with
+        the same name and size.
+        """
+        twin1 = TMTree('twin', [], 4)
+        twin2 = TMTree('twin', [], 4)
+        parent = TMTree('parent', [twin1, twin2], 8)
+        twin2.delete_self()
+        self.assertEqual(len(parent._subtrees), 1)
+        self.assertIs(parent._subtrees[0], twin1)
+        self.assertEqual(parent.data_size, 4)
+
+    def test_change_inside_deleted_subtree(self) -> None:
+        """Test that changes inside a deleted subtree, which keeps its parent,
+        do not change the sizes of the tree it was deleted from.
+        """
+        l1 = TMTree('l1', [], 5)
+        l2 = TMTree('l2', [], 7)
+        x = TMTree('x', [l1, l2], 12)
+        y = TMTree('y', [TMTree('l3', [], 10)], 10)
+        root = TMTree('root', [x, y], 22)
+
+        x.delete_self()
+        l1.change_size(0.5)
+        l2.delete_self()
+        self.assertEqual(root.data_size, 10)
+        self.assertEqual(x.data_size, 8)
+
+
+@pytest.fixture
+def path_tree(tmp_path: Path) -> FileSystemTree:
+    """Return the tree of a sample directory named paths, with a file in each
+    of its two folders.
+    """
+    (tmp_path / 'paths' / 'folder1').mkdir(parents=True)
+    (tmp_path / 'paths' / 'folder2').mkdir()
+    (tmp_path / 'paths' / 'folder1' / 'file.txt').write_text('path')
+    (tmp_path / 'paths' / 'folder2' / 'other.txt').write_text('path')
+    root = FileSystemTree(str(tmp_path / 'paths'))
+    _sort_subtrees(root)
+    return root
+
+
+def test_path_string(path_tree: FileSystemTree) -> None:
+    """Test that the path joins the names of the tree and its ancestors,
+    and stays the same when it is asked for again.
+    """
+    folder1 = path_tree._subtrees[0]
+    file = folder1._subtrees[0]
+    expected = os.path.join('paths', 'folder1', 'file.txt')
+    assert file.get_path_string() == expected
+    assert file.get_path_string() == expected
+    assert folder1.get_path_string() == os.path.join('paths', 'folder1')
+
+
+def test_path_string_after_move(path_tree: FileSystemTree) -> None:
+    """Test that the path of a moved tree reflects its new parent.
+    """
+    folder1, folder2 = path_tree._subtrees
+    file = folder1._subtrees[0]
+    file.get_path_string()
+    file.move(folder2)
+    assert file.get_path_string() == os.path.join('paths', 'folder2',
+                                                  'file.txt')
+
 
 class TestRepresentationInvariants(unittest.TestCase):
 
     def test_colour_invariant(self) -> None:
-        """Test that the RGB colour values are each in the range 0-255.
+        """Test that the RGB colour values of every tree in a large tree are
+        each in the range 0-255.
+        """
+        pool = _TreePool(_build_tree(4, 4))
+        self.assertEqual(len(pool.colours), 3 * len(pool.names))
+        self.assertGreaterEqual(min(pool.colours), 0)
+        self.assertLessEqual(max(pool.colours), 255)
+
+    def test_given_colour_is_shared(self) -> None:
+        """Test that trees given the same colour share that colour tuple.
+        """
+        colour = (12, 34, 56)
+        tree1 = TMTree("tree1", [], 10, colour)
+        tree2 = TMTree("tree2", [], 20, colour)
+        self.assertIs(tree1._colour, colour)
+        self.assertIs(tree2._colour, colour)
+
+    def test_no_instance_dict(self) -> None:
+        """Test that trees store their attributes in slots rather than in a
+        per-instance __dict__.
         """
-        tree = TMTree("tree", [], 10)
-        for value in tree._colour:
-            self.assertGreaterEqual(value, 0)
-            self.assertLessEqual(value, 255)
+        tree = TMTree("tree", [TMTree("leaf", [], 10)])
+        self.assertFalse(hasattr(tree, '__dict__'))
+        with self.assertRaises(AttributeError):
+            tree.unknown_attribute = 1
 
     def test_name_and_subtrees_invariant(self) -> None:
         """Test that if _name is None, then _subtrees is empty, _parent_tree
@@ -1013,8 +1148,11 @@ class TestRepresentationInvariants(unittest.TestCase):
         """
         child = TMTree("child", [], 10)
         parent = TMTree("parent", [child], 10)
-        self.assertIsNotNone(child._parent_tree)
-        self.assertIn(child, parent._subtrees)
+        self.assertIs(child._parent_tree, parent)
+        pool = _TreePool(parent)
+        self.assertEqual(pool.parent[1], 0)
+        self.assertEqual(pool.first_child[0], 1)
+        self.assertEqual(pool.next_sibling[1], -1)
 
     def test_expanded_invariant(self) -> None:
         """Test that if _expanded is True, then _parent_tree._expanded is True
@@ -1023,35 +1161,143 @@ class TestRepresentationInvariants(unittest.TestCase):
         """
         child = TMTree("child", [], 10)
         parent = TMTree("parent", [child], 10)
-        parent.expand()
-        self.assertTrue(parent._expanded)
-        self.assertTrue(child._parent_tree._expanded)
-
-        parent.collapse()
-        self.assertTrue(parent._expanded)
-        self.assertFalse(child._expanded)
+        # Each action, in order, with the expected _expanded of parent and
+        # child afterwards. Collapsing parent does nothing, since it is the
+        # root, while collapsing child collapses parent.
+        steps = [(parent.expand, True, False),
+                 (parent.collapse, True, False),
+                 (child.collapse, False, False)]
+        for action, parent_expanded, child_expanded in steps:
+            action()
+            with self.subTest(
+                    action=f'{action.__self__._name}.{action.__name__}'):
+                self.assertIs(parent._expanded, parent_expanded)
+                self.assertIs(child._expanded, child_expanded)
 
     def test_empty_tree_invariant(self) -> None:
         """Test that an empty tree has a data_size of 0, no subtrees, and no
         parent tree."""
         empty_tree = TMTree(None, [])
-        self.assertEqual(empty_tree.data_size, 0)
-        self.assertEqual(len(empty_tree._subtrees), 0)
         self.assertIsNone(empty_tree._parent_tree)
+        pool = _TreePool(empty_tree)
+        self.assertEqual(pool.sizes[0], 0)
+        self.assertEqual(pool.first_child[0], -1)
 
 
 ##############################################################################
 # Helpers
 ##############################################################################
 
+# The sort key for trees in _sort_subtrees
+_NAME_KEY = attrgetter('_name')
+
+# The colour shared by the trees built with _mk
+_FIXED_COLOUR = (128, 128, 128)
+
+
+def _mk(name: str, subtrees: List[TMTree], data_size: int,
+        colour: tuple[int, int, int] = _FIXED_COLOUR) -> TMTree:
+    """Return a new TMTree with the given <name>, <subtrees> and <data_size>,
+    whose colour is the shared <colour> tuple rather than a new random one.
+    """
+    return TMTree(name, subtrees, data_size, colour)
+
+
 def is_valid_colour(colour: tuple[int, int, int]) -> bool:
     """Return True iff <colour> is a valid colour. That is, if all of its
     values are between 0 and 255, inclusive.
     """
-    for i in range(3):
-        if not 0 <= colour[i] <= 255:
-            return False
-    return True
+    return (0 <= colour[0] <= 255 and 0 <= colour[1] <= 255
+            and 0 <= colour[2] <= 255)
+
+
+class _TreePool:
+    """The trees in a tree, flattened into parallel arrays.
+
+    Each tree is identified by its index in a pre-order traversal, with the
+    root at index 0, and -1 stands for no tree.
+
+    === Attributes ===
+    names:
+        The _name of each tree.
+    sizes:
+        The data_size of each tree.
+    colours:
+        The channels of the _colour of each tree, three entries per tree.
+    parent:
+        The index of each tree's parent.
+    first_child:
+        The index of each tree's first subtree.
+    next_sibling:
+        The index of the subtree after each tree in its parent's subtrees.
+    """
+    names: List[Optional[str]]
+    sizes: array
+    colours: array
+    parent: array
+    first_child: array
+    next_sibling: array
+
+    def __init__(self, tree: TMTree) -> None:
+        """Flatten <tree> into this pool.
+        """
+        self.names = []
+        self.sizes = array('q')
+        # Signed, so that channels outside of 0-255 are kept as they are
+        self.colours = array('h')
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+
+        # The index of the last subtree of each tree seen so far
+        last_child = []
+        stack = [(tree, -1)]
+        while stack:
+            current, parent = stack.pop()
+            index = len(self.names)
+            self.names.append(current._name)
+            self.sizes.append(current.data_size)
+            self.colours.extend(current._colour)
+            self.parent.append(parent)
+            self.first_child.append(-1)
+            self.next_sibling.append(-1)
+            last_child.append(-1)
+            if parent != -1:
+                # Subtrees are visited in order, so this one follows the
+                # previous subtree of its parent, if there is one
+                if last_child[parent] == -1:
+                    self.first_child[parent] = index
+                else:
+                    self.next_sibling[last_child[parent]] = index
+                last_child[parent] = index
+            stack.extend((subtree, index)
+                         for subtree in reversed(current._subtrees))
+
+
+def _expanded_bits(tree: TMTree) -> bytes:
+    """Return the _expanded flag of every tree in <tree> as one byte each, in
+    breadth-first order.
+    """
+    bits = bytearray()
+    queue = deque([tree])
+    while queue:
+        current = queue.popleft()
+        bits.append(current._expanded)
+        queue.extend(current._subtrees)
+    return bytes(bits)
+
+
+def _walk_heavy_path(tree: TMTree) -> Iterator[TMTree]:
+    """Yield <tree>, then the subtree of it with the most subtrees of its own,
+    and so on down to a leaf.
+
+    On a chain of folders, this visits every tree in a single descent.
+    """
+    current = tree
+    while current is not None:
+        yield current
+        current = max(current._subtrees, key=lambda t: len(t._subtrees),
+                      default=None)
 
 
 def _sort_subtrees(tree: TMTree) -> None:
@@ -1060,10 +1306,18 @@ def _sort_subtrees(tree: TMTree) -> None:
     YOUR SUBTREES IN THIS WAY. This allows the sample test to run on different
     operating systems.
 
-    This is recursive, and affects all levels of the tree.
+    This affects all levels of the tree, sorting the subtrees of each tree
+    before the tree's own, using an explicit stack so that deep trees do not
+    reach the recursion limit.
     """
-    if not tree.is_empty():
-        for subtree in tree._subtrees:
-            _sort_subtrees(subtree)
-
-        tree._subtrees.sort(key=lambda t: t._name)
+    stack = [tree]
+    order = []
+    while stack:
+        subtree = stack.pop()
+        if subtree.is_empty():
+            continue
+        order.append(subtree)
+        stack.extend(subtree._subtrees)
+
+    for subtree in reversed(order):
+        subtree._subtrees.sort(key=_NAME_KEY)